@@ -0,0 +1,162 @@
+"""Métricas de asistencia de un período, calculadas con NumPy.
+
+Las asistencias del período se leen con una sola consulta y se pasan a arreglos por
+columna (aprendiz, día, presente), ordenados por aprendiz y fecha. Todas las métricas
+salen de operaciones vectorizadas sobre esos arreglos (bincount, cumsum, ufunc.at), sin
+recorrer las filas en Python.
+"""
+from datetime import date
+from typing import NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Aprendiz, Asistencia
+
+DIAS_SEMANA = ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"]
+
+
+class DatosPeriodo(NamedTuple):
+    aprendiz_id: np.ndarray  # int64
+    dia: np.ndarray  # int64, date.toordinal()
+    presente: np.ndarray  # bool
+
+
+def cargar_datos(db: Session, fecha_inicio: date, fecha_fin: date,
+                 profesora_id: Optional[int] = None) -> DatosPeriodo:
+    """Asistencias del período en arreglos por columna, ordenadas por aprendiz y fecha"""
+    query = (
+        select(Asistencia.aprendiz_id, Asistencia.fecha, Asistencia.presente)
+        .where(Asistencia.fecha >= fecha_inicio, Asistencia.fecha <= fecha_fin)
+        .order_by(Asistencia.aprendiz_id, Asistencia.fecha)
+    )
+    if profesora_id is not None:
+        query = query.join(Aprendiz, Aprendiz.id == Asistencia.aprendiz_id).where(Aprendiz.profesora_id == profesora_id)
+
+    # Por la conexión y no por la sesión: filas planas, sin el procesamiento del ORM
+    filas = db.connection().execute(query).fetchall()
+    if not filas:
+        vacio = np.empty(0, dtype=np.int64)
+        return DatosPeriodo(vacio, vacio, np.empty(0, dtype=bool))
+
+    aprendices, fechas, presentes = zip(*filas)
+    return DatosPeriodo(
+        np.array(aprendices, dtype=np.int64),
+        # toordinal es mucho más rápido que convertir objetos date a datetime64
+        np.fromiter((f.toordinal() for f in fechas), dtype=np.int64, count=len(fechas)),
+        np.array(presentes, dtype=bool)
+    )
+
+
+def _porcentaje(presentes: np.ndarray, total: np.ndarray) -> np.ndarray:
+    return np.round(np.divide(presentes * 100.0, total, out=np.zeros(len(total)), where=total > 0), 2)
+
+
+def _pendiente(grupo: np.ndarray, x: np.ndarray, y: np.ndarray, grupos: int) -> np.ndarray:
+    """Pendiente de mínimos cuadrados de y sobre x por grupo (0 si no está definida)"""
+    n = np.bincount(grupo, minlength=grupos).astype(float)
+    sx = np.bincount(grupo, x, grupos)
+    sy = np.bincount(grupo, y, grupos)
+    sxy = np.bincount(grupo, x * y, grupos)
+    sxx = np.bincount(grupo, x * x, grupos)
+    denominador = n * sxx - sx * sx
+    return np.divide(n * sxy - sx * sy, denominador, out=np.zeros(grupos), where=denominador > 0)
+
+
+def _rachas_ausencia(grupo: np.ndarray, presente: np.ndarray, grupos: int):
+    """(racha máxima, racha actual) de ausencias consecutivas por grupo, en registros"""
+    ausente = ~presente
+    nuevo_grupo = np.ones(len(grupo), dtype=bool)
+    nuevo_grupo[1:] = grupo[1:] != grupo[:-1]
+    anterior_ausente = np.zeros(len(grupo), dtype=bool)
+    anterior_ausente[1:] = ausente[:-1]
+    inicio = ausente & (nuevo_grupo | ~anterior_ausente)
+
+    # Cada racha recibe un número; las filas presentes quedan con 0
+    racha = np.cumsum(inicio) * ausente
+    largos = np.bincount(racha)[1:]
+    grupo_racha = grupo[inicio]
+
+    maxima = np.zeros(grupos, dtype=np.int64)
+    np.maximum.at(maxima, grupo_racha, largos)
+
+    # La racha actual es la que incluye el último registro de cada grupo
+    actual = np.zeros(grupos, dtype=np.int64)
+    ultimo = np.ones(len(grupo), dtype=bool)
+    ultimo[:-1] = grupo[1:] != grupo[:-1]
+    abiertas = ultimo & ausente
+    actual[grupo[abiertas]] = largos[racha[abiertas] - 1]
+    return maxima, actual
+
+
+def calcular_metricas(datos: DatosPeriodo) -> dict:
+    """Totales, racha de ausencias y tendencia por aprendiz; tasas por semana y por día de la semana"""
+    if len(datos.aprendiz_id) == 0:
+        return {"aprendices": {}, "semanas": [], "dias_semana": [], "tendencia_semanal": 0.0}
+
+    ids, grupo = np.unique(datos.aprendiz_id, return_inverse=True)
+    grupos = len(ids)
+    presente = datos.presente
+    y = presente.astype(float)
+
+    total = np.bincount(grupo, minlength=grupos)
+    presentes = np.bincount(grupo, y, grupos).astype(np.int64)
+    racha_maxima, racha_actual = _rachas_ausencia(grupo, presente, grupos)
+
+    # Tendencia: cambio de la probabilidad de asistir por semana, en puntos porcentuales
+    x = (datos.dia - datos.dia.min()).astype(float)
+    tendencia = np.round(_pendiente(grupo, x, y, grupos) * 7 * 100, 2)
+
+    # El ordinal 1 (0001-01-01) fue lunes: (día - 1) % 7 da 0 = lunes
+    dia_semana = (datos.dia - 1) % 7
+    total_dia_semana = np.bincount(dia_semana, minlength=7)
+    presentes_dia_semana = np.bincount(dia_semana, y, 7).astype(np.int64)
+
+    lunes = datos.dia - dia_semana
+    semanas, semana = np.unique(lunes, return_inverse=True)
+    total_semana = np.bincount(semana, minlength=len(semanas))
+    presentes_semana = np.bincount(semana, y, len(semanas)).astype(np.int64)
+
+    # Tendencia global sobre las tasas diarias
+    dias, dia = np.unique(datos.dia, return_inverse=True)
+    tasa_dia = np.bincount(dia, y, len(dias)) / np.bincount(dia, minlength=len(dias))
+    tendencia_global = _pendiente(np.zeros(len(dias), dtype=np.int64), (dias - dias[0]).astype(float), tasa_dia, 1)[0]
+
+    porcentaje = _porcentaje(presentes, total)
+    porcentaje_dia_semana = _porcentaje(presentes_dia_semana, total_dia_semana)
+    porcentaje_semana = _porcentaje(presentes_semana, total_semana)
+
+    return {
+        "aprendices": {
+            int(ids[i]): {
+                "total_clases": int(total[i]),
+                "asistencias": int(presentes[i]),
+                "faltas": int(total[i] - presentes[i]),
+                "porcentaje_asistencia": float(porcentaje[i]),
+                "racha_ausencias_max": int(racha_maxima[i]),
+                "racha_ausencias_actual": int(racha_actual[i]),
+                "tendencia_semanal": float(tendencia[i])
+            }
+            for i in range(grupos)
+        },
+        "semanas": [
+            {
+                "inicio": date.fromordinal(int(semanas[i])),
+                "total_registros": int(total_semana[i]),
+                "asistencias": int(presentes_semana[i]),
+                "porcentaje_asistencia": float(porcentaje_semana[i])
+            }
+            for i in range(len(semanas))
+        ],
+        "dias_semana": [
+            {
+                "dia": DIAS_SEMANA[i],
+                "total_registros": int(total_dia_semana[i]),
+                "asistencias": int(presentes_dia_semana[i]),
+                "porcentaje_asistencia": float(porcentaje_dia_semana[i])
+            }
+            for i in range(7) if total_dia_semana[i]
+        ],
+        "tendencia_semanal": round(float(tendencia_global) * 7 * 100, 2)
+    }
@@ -3,12 +3,14 @@ from typing import Optional
 import os
 import jwt
 from jwt.exceptions import InvalidTokenError
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from database import get_db
 from models import Profesora
-from passlib.context import CryptContext
+from cache_usuarios import UsuarioActual, cache_usuarios
+from epocas_token import mapa_epocas
+from passwords import pwd_context, verify_password, get_password_hash
 import secrets
 
 SECRET_KEY = os.getenv('SECRET_KEY')
@@ -20,16 +22,12 @@ if not SECRET_KEY or SECRET_KEY == 'change_this_in_production':
 SECRET_KEY = os.getenv('SECRET_KEY', 'change_this_in_production')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', '60'))
+# Tokens con id, rol y época: las peticiones de lectura se autorizan sin ir a la base
+JWT_CLAIMS_COMPLETOS = os.getenv('JWT_CLAIMS_COMPLETOS', 'false').lower() == 'true'
 
-security = HTTPBearer()
-
-pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
-
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+METODOS_LECTURA = ('GET', 'HEAD', 'OPTIONS')
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+security = HTTPBearer()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -41,39 +39,101 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str) -> str:
+def datos_token(profesora) -> dict:
+    """Claims para el token de acceso de una profesora"""
+    data = {'sub': profesora.email}
+    if JWT_CLAIMS_COMPLETOS:
+        data.update({
+            'pid': profesora.id,
+            'adm': bool(profesora.is_admin),
+            'ep': profesora.token_epoch or 0,
+            'nom': profesora.nombre,
+            'esp': profesora.especialidad,
+        })
+    return data
+
+def decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get('sub') or payload.get('email')
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED, 
-                detail='Token inválido - email no encontrado en payload'
-            )
-        return email
     except InvalidTokenError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, 
             detail=f'Token inválido: {str(e)}'
         ) from e
+    if (payload.get('sub') or payload.get('email')) is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, 
+            detail='Token inválido - email no encontrado en payload'
+        )
+    return payload
+
+def verify_token(token: str) -> str:
+    payload = decode_token(token)
+    return payload.get('sub') or payload.get('email')
+
+def _epoca_vigente(payload: dict) -> Optional[bool]:
+    """True/False si el token trae época y se conoce la de la profesora; None si no aplica"""
+    if 'pid' not in payload or 'ep' not in payload:
+        return None
+    epoca = mapa_epocas.epoca(payload['pid'])
+    if epoca is None:
+        # Profesora creada o borrada desde la última recarga: decide la base
+        return None
+    return epoca == payload['ep']
+
+def _usuario_desde_claims(payload: dict) -> UsuarioActual:
+    return UsuarioActual(
+        payload['pid'],
+        payload.get('nom'),
+        payload.get('sub') or payload.get('email'),
+        payload.get('esp'),
+        payload.get('adm', False),
+        True,
+        payload['ep']
+    )
 
 def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security), 
     db: Session = Depends(get_db)
 ):
     try:
-        email = verify_token(credentials.credentials)
-        user = db.query(Profesora).filter(Profesora.email == email).first()
-        
-        if user is None:
+        payload = decode_token(credentials.credentials)
+        email = payload.get('sub') or payload.get('email')
+
+        # Tokens con claims completos: una época vieja significa token revocado y,
+        # si sigue vigente, las lecturas se autorizan sin ir a la base
+        vigente = _epoca_vigente(payload)
+        if vigente is False:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail='Usuario no encontrado',
+                detail='Token revocado',
                 headers={'WWW-Authenticate': 'Bearer'},
             )
+        if vigente and request.method in METODOS_LECTURA:
+            return _usuario_desde_claims(payload)
+
+        # La caché evita releer la profesora en cada petición; los endpoints de
+        # administración la invalidan al modificarla
+        user = cache_usuarios.obtener(email)
+        # Otro worker pudo desactivarla o borrarla: su época cambió o ya no está en el mapa
+        if user is not None and mapa_epocas.epoca(user.id) != user.token_epoch:
+            user = None
+        if user is None:
+            profesora = db.query(Profesora).filter(Profesora.email == email).first()
+
+            if profesora is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail='Usuario no encontrado',
+                    headers={'WWW-Authenticate': 'Bearer'},
+                )
+
+            user = UsuarioActual.desde_profesora(profesora)
+            cache_usuarios.guardar(email, user)
         
-        # Verificar si el usuario está activo (solo si el campo existe)
-        if hasattr(user, 'activa') and not user.activa:
+        # Verificar si el usuario está activo
+        if not user.activa:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail='Usuario inactivo',
@@ -92,10 +152,11 @@ def get_current_user(
         )
 
 def get_current_admin(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security), 
     db: Session = Depends(get_db)
 ):
-    user = get_current_user(credentials, db)
+    user = get_current_user(request, credentials, db)
     # Verificar si es admin usando el campo del modelo
     if not user.is_admin:
         raise HTTPException(
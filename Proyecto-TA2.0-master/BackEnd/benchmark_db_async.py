@@ -0,0 +1,98 @@
+"""Comparar el throughput de handlers `async def` con la sesión sync y con AsyncSession.
+
+Monta una app mínima con dos endpoints que hacen la misma consulta (la lista de aprendices
+de una profesora) y les lanza PETICIONES concurrentes en el mismo proceso. Con la sesión
+sync cada consulta bloquea el event loop, así que las peticiones se atienden de una en
+una; con AsyncSession se solapan. En MySQL se suma SLEEP(LATENCIA) a cada consulta para
+simular una consulta lenta o una base remota.
+
+Usa la base configurada en .env (MYSQL_* / DATABASE_URL_ASYNC).
+Uso: python benchmark_db_async.py [peticiones] [latencia_segundos]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import func, select, text
+
+from database import AsyncSessionLocal, SessionLocal, async_engine, engine
+from models import Aprendiz
+
+
+def _percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def _crear_app(profesora_id: int, latencia: float) -> FastAPI:
+    app = FastAPI()
+    consulta = select(Aprendiz.id, Aprendiz.nombre).where(Aprendiz.profesora_id == profesora_id)
+    espera = text("SELECT SLEEP(:s)").bindparams(s=latencia) if latencia else None
+
+    @app.get("/sync")
+    async def con_sesion_sync():
+        # Comportamiento anterior: sesión sync dentro de un handler async
+        db = SessionLocal()
+        try:
+            if espera is not None:
+                db.execute(espera)
+            return len(db.execute(consulta).all())
+        finally:
+            db.close()
+
+    @app.get("/async")
+    async def con_sesion_async():
+        async with AsyncSessionLocal() as db:
+            if espera is not None:
+                await db.execute(espera)
+            return len((await db.execute(consulta)).all())
+
+    return app
+
+
+async def _escenario(nombre: str, cliente: httpx.AsyncClient, ruta: str, peticiones: int):
+    latencias = []
+
+    async def peticion():
+        respuesta = await cliente.get(ruta)
+        respuesta.raise_for_status()
+        latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(peticion() for _ in range(peticiones)))
+    total = time.perf_counter() - inicio
+
+    print(f"{nombre}:")
+    print(f"   peticiones/s: {peticiones / total:.1f}")
+    print(f"   latencia p50: {statistics.median(latencias) * 1000:.0f} ms  "
+          f"p99: {_percentil(latencias, 99) * 1000:.0f} ms")
+
+
+async def main(peticiones: int, latencia: float):
+    if engine.dialect.name != "mysql":
+        latencia = 0
+
+    async with AsyncSessionLocal() as db:
+        fila = (await db.execute(
+            select(Aprendiz.profesora_id, func.count())
+            .group_by(Aprendiz.profesora_id)
+            .order_by(func.count().desc())
+            .limit(1)
+        )).first()
+    profesora_id = fila[0] if fila else 0
+
+    app = _crear_app(profesora_id, latencia)
+    print(f"{peticiones} peticiones concurrentes, latencia simulada {latencia * 1000:.0f} ms\n")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as cliente:
+        await _escenario("Sesión sync en handler async", cliente, "/sync", peticiones)
+        await _escenario("AsyncSession", cliente, "/async", peticiones)
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    peticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    latencia = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    asyncio.run(main(peticiones, latencia))
@@ -0,0 +1,107 @@
+"""Comparar la serialización de las listas grandes: FastAPI estándar, Pydantic y modo rápido.
+
+Para GET /asistencia/, GET /aprendices y GET /clases arma FILAS elementos con la misma
+forma que devuelven los handlers y mide solo la serialización de la respuesta:
+
+- estándar: lo que hace FastAPI con response_model (validar, pasar a tipos JSON y json.dumps)
+- pydantic: TypeAdapter del response_model, validate_python + dump_json
+- rápido:   respuestas_json.a_bytes, el camino de JSON_RAPIDO=true
+
+También revisa que los tres produzcan el mismo JSON. No necesita la base ni el servidor.
+
+Uso: python benchmark_json.py [filas]
+"""
+import asyncio
+import json
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import TypeAdapter
+
+from respuestas_json import a_bytes, orjson
+from routers.aprendices import AprendizResponse
+from routers.asistencia import AsistenciaResponse
+from routers.clases import LISTA_CLASES, ClaseResponse, ProfesoraResponse
+
+REPETICIONES = 5
+
+PROFESORA = {"id": 1, "nombre": "Profesora", "email": "profesora@local", "especialidad": "Robótica",
+             "is_admin": False, "activa": True}
+
+
+def _asistencias(filas: int) -> list:
+    inicio = date(2024, 1, 1)
+    return [
+        {"id": i, "aprendiz_id": i % 500, "fecha": inicio + timedelta(days=i % 200), "presente": i % 3 != 0,
+         "profesora_id": 1, "aprendiz": {"id": i % 500, "nombre": f"Aprendiz {i % 500}", "documento": str(1000000 + i)}}
+        for i in range(filas)
+    ]
+
+
+def _aprendices(filas: int) -> list:
+    return [
+        {"id": i, "nombre": f"Aprendiz {i}", "documento": str(1000000 + i), "profesora_id": 1, "profesora": PROFESORA}
+        for i in range(filas)
+    ]
+
+
+def _clases(filas: int) -> list:
+    inicio = datetime(2024, 1, 1, 8)
+    profesora = ProfesoraResponse(**PROFESORA)
+    return [
+        ClaseResponse(id=i, profesora_id=1, titulo=f"Clase {i}", fecha_inicio=inicio + timedelta(hours=i),
+                      fecha_fin=inicio + timedelta(hours=i + 1), ubicacion="Colegio", descripcion=None,
+                      activa=True, profesora=profesora)
+        for i in range(filas)
+    ]
+
+
+def _medir(funcion) -> tuple:
+    tiempos = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return resultado, statistics.median(tiempos)
+
+
+def comparar(nombre: str, modelo, contenido: list, adaptador: TypeAdapter = None):
+    campo = create_response_field(name=f"respuesta_{nombre}", type_=List[modelo])
+    pydantic_lista = TypeAdapter(List[modelo])
+
+    estandar, t_estandar = _medir(
+        lambda: JSONResponse(asyncio.run(serialize_response(field=campo, response_content=contenido))).body
+    )
+    validado, t_pydantic = _medir(
+        lambda: pydantic_lista.dump_json(pydantic_lista.validate_python(contenido, from_attributes=True))
+    )
+    rapido, t_rapido = _medir(lambda: a_bytes(contenido, adaptador))
+
+    iguales = json.loads(estandar) == json.loads(validado) == json.loads(rapido)
+    print(f"{nombre} ({len(contenido)} elementos, {len(rapido) / 1024:.0f} KB){'' if iguales else '  ❌ JSON distinto'}")
+    print(f"   estándar: {t_estandar * 1000:7.1f} ms")
+    print(f"   pydantic: {t_pydantic * 1000:7.1f} ms")
+    print(f"   rápido:   {t_rapido * 1000:7.1f} ms ({t_estandar / t_rapido:.0f}x)")
+    return iguales
+
+
+def main(filas: int) -> bool:
+    if orjson is None:
+        print("⚠️  orjson no está instalado: el modo rápido usa pydantic-core para los dicts")
+    resultados = [
+        comparar("GET /asistencia/", AsistenciaResponse, _asistencias(filas)),
+        comparar("GET /aprendices", AprendizResponse, _aprendices(filas)),
+        comparar("GET /clases", ClaseResponse, _clases(filas), LISTA_CLASES),
+    ]
+    return all(resultados)
+
+
+if __name__ == "__main__":
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    sys.exit(0 if main(filas) else 1)
@@ -0,0 +1,70 @@
+"""Comparar la latencia de login con bcrypt en el event loop y en el pool de passwords.py.
+
+Simula una ola de LOGINS que llegan a la vez a un mismo worker (la latencia se mide desde
+la llegada) y, en paralelo, una tarea que mide cuánto se retrasa el loop: lo que notaría
+cualquier otra petición del worker. No necesita base de datos ni servidor.
+
+Uso: python benchmark_login.py [logins]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from passwords import HASH_WORKERS, pwd_context, verificar_password
+
+PASSWORD = "clave-de-prueba"
+
+
+def _percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+async def _medir_retraso_loop(detener: asyncio.Event, retrasos: list, intervalo: float = 0.01):
+    while not detener.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(intervalo)
+        retrasos.append(time.perf_counter() - inicio - intervalo)
+
+
+async def _escenario(nombre: str, verificar, hashed: str, logins: int):
+    latencias = []
+    retrasos = []
+
+    async def login():
+        assert await verificar(PASSWORD, hashed)
+        latencias.append(time.perf_counter() - inicio)
+
+    detener = asyncio.Event()
+    monitor = asyncio.create_task(_medir_retraso_loop(detener, retrasos))
+    await asyncio.sleep(0)
+    inicio = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    total = time.perf_counter() - inicio
+    detener.set()
+    await monitor
+
+    print(f"{nombre}:")
+    print(f"   logins/s: {logins / total:.1f}")
+    print(f"   latencia p50: {statistics.median(latencias) * 1000:.0f} ms  "
+          f"p99: {_percentil(latencias, 99) * 1000:.0f} ms")
+    if retrasos:
+        print(f"   retraso del event loop máx: {max(retrasos) * 1000:.0f} ms")
+
+
+async def _verificar_en_loop(plano: str, hashed: str) -> bool:
+    # Comportamiento anterior: bcrypt directamente dentro del handler async
+    return pwd_context.verify(plano, hashed)
+
+
+async def main(logins: int):
+    hashed = pwd_context.hash(PASSWORD)
+    print(f"{logins} logins simultáneos, HASH_WORKERS={HASH_WORKERS}\n")
+    await _escenario("bcrypt en el event loop", _verificar_en_loop, hashed, logins)
+    await _escenario("bcrypt en el pool (passwords.py)", verificar_password, hashed, logins)
+
+
+if __name__ == "__main__":
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    asyncio.run(main(logins))
@@ -0,0 +1,71 @@
+"""Medir el reporte completo (/asistencia/reporte?detalle=completo) con datos sintéticos.
+
+Genera APRENDICES x DIAS registros de asistencia en una base SQLite en memoria y mide por
+separado la consulta (cargar_datos) y el cálculo vectorizado (calcular_metricas). No
+necesita la base de MySQL ni el servidor.
+
+Uso: python benchmark_reporte.py [aprendices] [dias]
+"""
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from analitica_asistencia import calcular_metricas, cargar_datos
+from models import Aprendiz, Asistencia, Base, Profesora
+
+REPETICIONES = 5
+
+
+def _poblar(db: Session, aprendices: int, dias: int, inicio: date):
+    db.add(Profesora(id=1, nombre="Benchmark", email="benchmark@local", hashed_password="-", especialidad="-"))
+    db.execute(insert(Aprendiz), [{"id": i, "nombre": f"Aprendiz {i}", "profesora_id": 1} for i in range(1, aprendices + 1)])
+
+    rng = np.random.default_rng(7)
+    # Probabilidad de asistir distinta por aprendiz para que haya rachas y tendencias
+    probabilidad = rng.uniform(0.5, 0.95, aprendices)
+    presentes = rng.random((aprendices, dias)) < probabilidad[:, None]
+    filas = [
+        {"aprendiz_id": a + 1, "fecha": inicio + timedelta(days=d), "presente": bool(presentes[a, d]), "profesora_id": 1}
+        for a in range(aprendices) for d in range(dias)
+    ]
+    db.execute(insert(Asistencia), filas)
+    db.commit()
+
+
+def _medir(funcion) -> tuple:
+    tiempos = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return resultado, statistics.median(tiempos)
+
+
+def main(aprendices: int, dias: int):
+    inicio = date(2024, 1, 1)
+    fin = inicio + timedelta(days=dias - 1)
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        print(f"Generando {aprendices} aprendices x {dias} días ({aprendices * dias} registros)...")
+        _poblar(db, aprendices, dias, inicio)
+
+        datos, t_consulta = _medir(lambda: cargar_datos(db, inicio, fin, 1))
+        metricas, t_calculo = _medir(lambda: calcular_metricas(datos))
+
+    print(f"   consulta y arreglos: {t_consulta * 1000:.0f} ms")
+    print(f"   métricas (NumPy):    {t_calculo * 1000:.0f} ms")
+    print(f"   total:               {(t_consulta + t_calculo) * 1000:.0f} ms (mediana de {REPETICIONES})")
+    print(f"   {len(metricas['aprendices'])} aprendices, {len(metricas['semanas'])} semanas")
+
+
+if __name__ == "__main__":
+    aprendices = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    dias = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    main(aprendices, dias)
@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+from typing import Optional
+
+# Configuración desde .env
+DASHBOARD_CACHE_TTL_SEGUNDOS = int(os.getenv("DASHBOARD_CACHE_TTL_SEGUNDOS", "30"))
+
+
+class CacheDashboard:
+    """Caché con TTL del payload de /estadisticas/dashboard por (usuario, rol).
+
+    El dashboard de una profesora solo depende de sus datos; el de un admin, de todos. Por
+    eso una escritura de una profesora invalida su entrada y las de los admins, y una
+    escritura de un admin (que puede tocar datos de cualquiera) vacía la caché.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._datos = {}  # (usuario_id, es_admin) -> (vence_en, payload)
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, usuario_id: int, es_admin: bool) -> Optional[dict]:
+        with self._lock:
+            entrada = self._datos.get((usuario_id, es_admin))
+            if entrada is None or entrada[0] < time.monotonic():
+                self.fallos += 1
+                return None
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, usuario_id: int, es_admin: bool, payload: dict):
+        with self._lock:
+            ahora = time.monotonic()
+            # Las entradas vencidas se descartan aquí para no acumular usuarios inactivos
+            for clave in [c for c, (vence, _) in self._datos.items() if vence < ahora]:
+                del self._datos[clave]
+            self._datos[(usuario_id, es_admin)] = (ahora + self.ttl, payload)
+
+    def invalidar(self, profesora_id: int, es_admin: bool = False):
+        """Invalidar lo que puede haber cambiado tras una escritura de esa profesora"""
+        if es_admin:
+            self.limpiar()
+            return
+        with self._lock:
+            for clave in [c for c in self._datos if c[0] == profesora_id or c[1]]:
+                del self._datos[clave]
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "entradas": len(self._datos),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos
+            }
+
+
+cache_dashboard = CacheDashboard(DASHBOARD_CACHE_TTL_SEGUNDOS)
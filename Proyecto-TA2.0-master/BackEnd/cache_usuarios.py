@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Configuración desde .env
+# Cada worker tiene su caché. Los cambios hechos en otro worker (desactivar, borrar, cambiar
+# rol o contraseña) se notan antes del TTL: auth.get_current_user descarta la entrada si su
+# token_epoch ya no es el de epocas_token.mapa_epocas, que se recarga de la base cada
+# EPOCAS_REFRESCO_SEGUNDOS.
+USUARIOS_CACHE_TTL_SEGUNDOS = int(os.getenv("USUARIOS_CACHE_TTL_SEGUNDOS", "60"))
+USUARIOS_CACHE_MAX = int(os.getenv("USUARIOS_CACHE_MAX", "1000"))
+
+
+class UsuarioActual:
+    """Copia ligera de los campos de Profesora que usan los endpoints autenticados.
+
+    Tiene los mismos nombres de atributo que el modelo, así que los routers y
+    ProfesoraResponse.model_validate la tratan igual que a una Profesora.
+    """
+    __slots__ = ("id", "nombre", "email", "especialidad", "is_admin", "activa", "token_epoch")
+
+    def __init__(self, id, nombre, email, especialidad, is_admin, activa, token_epoch=0):
+        self.id = id
+        self.nombre = nombre
+        self.email = email
+        self.especialidad = especialidad
+        self.is_admin = bool(is_admin)
+        self.activa = True if activa is None else bool(activa)
+        self.token_epoch = token_epoch or 0
+
+    @classmethod
+    def desde_profesora(cls, profesora) -> "UsuarioActual":
+        return cls(
+            profesora.id,
+            profesora.nombre,
+            profesora.email,
+            profesora.especialidad,
+            getattr(profesora, 'is_admin', False),
+            getattr(profesora, 'activa', True),
+            getattr(profesora, 'token_epoch', 0)
+        )
+
+
+class CacheUsuarios:
+    """Caché LRU con TTL de usuarios autenticados, indexada por email (el `sub` del token)"""
+
+    def __init__(self, ttl: int, maximo: int):
+        self.ttl = ttl
+        self.maximo = maximo
+        self._datos = OrderedDict()  # email -> (vence_en, UsuarioActual)
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def obtener(self, email: str) -> Optional[UsuarioActual]:
+        with self._lock:
+            entrada = self._datos.get(email)
+            if entrada is None or entrada[0] < time.monotonic():
+                if entrada is not None:
+                    del self._datos[email]
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(email)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, email: str, usuario: UsuarioActual):
+        with self._lock:
+            self._datos[email] = (time.monotonic() + self.ttl, usuario)
+            self._datos.move_to_end(email)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def invalidar_profesora(self, profesora_id: int):
+        """Quitar de la caché a la profesora (por id, sirve aunque haya cambiado su email)"""
+        with self._lock:
+            for email in [e for e, (_, u) in self._datos.items() if u.id == profesora_id]:
+                del self._datos[email]
+            self.invalidaciones += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "entradas": len(self._datos),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "invalidaciones": self.invalidaciones
+            }
+
+
+cache_usuarios = CacheUsuarios(USUARIOS_CACHE_TTL_SEGUNDOS, USUARIOS_CACHE_MAX)
@@ -0,0 +1,220 @@
+"""Compresión de respuestas (zstd, brotli o gzip según Accept-Encoding).
+
+Middleware ASGI registrado en main.py. Las respuestas normales se comprimen de una vez; las
+StreamingResponse (exportar, NDJSON) se comprimen fragmento por fragmento y lo que sale del
+compresor se envía enseguida, sin juntar el cuerpo en memoria. Para no perder compresión con
+fragmentos chicos (una línea de NDJSON), el compresor se vacía cada COMPRESION_FLUSH_BYTES
+de entrada y no en cada fragmento. La compresión corre en un pool de hilos acotado, nunca
+en el event loop. Si el pool está lleno la respuesta sale sin comprimir en vez de esperar.
+
+brotli y zstandard son opcionales: si no están instalados solo se ofrece gzip.
+"""
+import asyncio
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Configuración desde .env
+COMPRESION_MIN_BYTES = int(os.getenv("COMPRESION_MIN_BYTES", "1024"))
+COMPRESION_FLUSH_BYTES = int(os.getenv("COMPRESION_FLUSH_BYTES", "16384"))
+COMPRESION_WORKERS = int(os.getenv("COMPRESION_WORKERS", str(min(4, os.cpu_count() or 1))))
+COMPRESION_COLA_MAX = int(os.getenv("COMPRESION_COLA_MAX", "32"))
+GZIP_NIVEL = int(os.getenv("GZIP_NIVEL", "6"))
+BROTLI_CALIDAD = int(os.getenv("BROTLI_CALIDAD", "4"))  # las calidades altas son lentas para streaming
+ZSTD_NIVEL = int(os.getenv("ZSTD_NIVEL", "3"))
+
+# Tipos que vale la pena comprimir; xlsx ya es un zip
+TIPOS_COMPRIMIBLES = ("text/", "application/json", "application/x-ndjson", "application/javascript", "application/xml")
+
+# zlib, brotli y zstd liberan el GIL mientras comprimen
+_executor = ThreadPoolExecutor(max_workers=COMPRESION_WORKERS, thread_name_prefix="compresion")
+# Respuestas comprimiéndose a la vez; por encima de esto salen sin comprimir
+_cupos = threading.BoundedSemaphore(COMPRESION_WORKERS + COMPRESION_COLA_MAX)
+
+
+class _Gzip:
+    def __init__(self):
+        self._z = zlib.compressobj(GZIP_NIVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def comprimir(self, datos: bytes, final: bool, vaciar: bool) -> bytes:
+        salida = self._z.compress(datos)
+        if final or vaciar:
+            salida += self._z.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+        return salida
+
+
+class _Brotli:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=BROTLI_CALIDAD)
+
+    def comprimir(self, datos: bytes, final: bool, vaciar: bool) -> bytes:
+        salida = self._c.process(datos)
+        if final:
+            salida += self._c.finish()
+        elif vaciar:
+            salida += self._c.flush()
+        return salida
+
+
+class _Zstd:
+    def __init__(self):
+        self._c = zstandard.ZstdCompressor(level=ZSTD_NIVEL).compressobj()
+
+    def comprimir(self, datos: bytes, final: bool, vaciar: bool) -> bytes:
+        salida = self._c.compress(datos)
+        if final:
+            salida += self._c.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+        elif vaciar:
+            salida += self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return salida
+
+
+def codificaciones_disponibles() -> dict:
+    """{nombre: compresor} en orden de preferencia del servidor"""
+    disponibles = {}
+    if zstandard is not None:
+        disponibles["zstd"] = _Zstd
+    if brotli is not None:
+        disponibles["br"] = _Brotli
+    disponibles["gzip"] = _Gzip
+    return disponibles
+
+
+CODIFICACIONES = codificaciones_disponibles()
+
+
+def elegir_codificacion(accept_encoding: str) -> Optional[str]:
+    """La codificación preferida por el servidor entre las que el cliente acepta (q > 0)"""
+    aceptadas = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        q = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        if nombre:
+            aceptadas[nombre] = q
+
+    for nombre in CODIFICACIONES:
+        if aceptadas.get(nombre, aceptadas.get("*", 0)) > 0:
+            return nombre
+    return None
+
+
+class CompresionMiddleware:
+    def __init__(self, app, minimo: int = COMPRESION_MIN_BYTES):
+        self.app = app
+        self.minimo = minimo
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        codificacion = elegir_codificacion(Headers(scope=scope).get("accept-encoding", ""))
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+
+        respuesta = _RespuestaComprimida(send, codificacion, self.minimo)
+        try:
+            await self.app(scope, receive, respuesta.enviar)
+        finally:
+            respuesta.liberar()
+
+
+class _RespuestaComprimida:
+    """Envoltorio de `send` para una respuesta: decide con el primer fragmento del cuerpo"""
+
+    def __init__(self, send, codificacion: str, minimo: int):
+        self.send = send
+        self.codificacion = codificacion
+        self.minimo = minimo
+        self.inicio = None
+        self.compresor = None
+        self.directo = False
+        self.con_cupo = False
+        self.sin_vaciar = 0  # bytes de entrada desde el último vaciado del compresor
+
+    def liberar(self):
+        if self.con_cupo:
+            self.con_cupo = False
+            _cupos.release()
+
+    def _comprimible(self, headers: MutableHeaders, cuerpo: bytes, final: bool) -> bool:
+        if self.inicio["status"] < 200 or self.inicio["status"] in (204, 304):
+            return False
+        if "content-encoding" in headers:
+            return False
+        if not headers.get("content-type", "").startswith(TIPOS_COMPRIMIBLES):
+            return False
+        if final:
+            return len(cuerpo) >= self.minimo
+        largo = headers.get("content-length")
+        return largo is None or int(largo) >= self.minimo
+
+    async def _comprimir(self, cuerpo: bytes, final: bool) -> bytes:
+        self.sin_vaciar += len(cuerpo)
+        vaciar = self.sin_vaciar >= COMPRESION_FLUSH_BYTES
+        if vaciar:
+            self.sin_vaciar = 0
+        return await asyncio.wrap_future(_executor.submit(self.compresor.comprimir, cuerpo, final, vaciar))
+
+    async def enviar(self, message):
+        tipo = message["type"]
+        if tipo == "http.response.start":
+            # Se envía junto con el primer fragmento, cuando ya se sabe si se comprime
+            self.inicio = message
+            return
+        if tipo != "http.response.body" or self.directo:
+            await self.send(message)
+            return
+
+        cuerpo = message.get("body", b"")
+        final = not message.get("more_body", False)
+
+        if self.compresor is None:
+            headers = MutableHeaders(raw=self.inicio["headers"])
+            if not self._comprimible(headers, cuerpo, final) or not _cupos.acquire(blocking=False):
+                self.directo = True
+                await self.send(self.inicio)
+                await self.send(message)
+                return
+
+            self.con_cupo = True
+            self.compresor = CODIFICACIONES[self.codificacion]()
+            headers["Content-Encoding"] = self.codificacion
+            headers.add_vary_header("Accept-Encoding")
+            if final:
+                comprimido = await self._comprimir(cuerpo, True)
+                headers["Content-Length"] = str(len(comprimido))
+                await self.send(self.inicio)
+                await self.send({"type": "http.response.body", "body": comprimido})
+                self.liberar()
+                return
+            # Streaming: el largo final no se conoce
+            del headers["Content-Length"]
+            await self.send(self.inicio)
+
+        comprimido = await self._comprimir(cuerpo, final)
+        if comprimido or final:
+            await self.send({"type": "http.response.body", "body": comprimido, "more_body": not final})
+        if final:
+            self.liberar()
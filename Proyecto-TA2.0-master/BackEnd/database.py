@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import QueuePool
 import os
@@ -20,6 +21,12 @@ escaped_password = quote_plus(MYSQL_PASSWORD)
 # URL de conexión a MySQL
 DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{escaped_password}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}?charset=utf8mb4"
 
+# URL del motor async (aiomysql). Se puede apuntar a sqlite+aiosqlite:///archivo.db para pruebas
+DATABASE_URL_ASYNC = os.getenv(
+    "DATABASE_URL_ASYNC",
+    f"mysql+aiomysql://{MYSQL_USER}:{escaped_password}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}?charset=utf8mb4"
+)
+
 # Configuración del motor de base de datos
 engine = create_engine(
     DATABASE_URL,
@@ -38,6 +45,23 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# Motor async para los routers `async def`: las consultas no bloquean el event loop
+_opciones_async = {} if DATABASE_URL_ASYNC.startswith("sqlite") else {
+    "pool_size": 10,
+    "max_overflow": 20,
+    "pool_pre_ping": True,
+    "pool_recycle": 3600,
+}
+async_engine = create_async_engine(DATABASE_URL_ASYNC, echo=False, **_opciones_async)
+
+# expire_on_commit=False: tras el commit los objetos se siguen leyendo sin otra consulta
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Dependencia para obtener la sesión de la base de datos
 def get_db():
     db = SessionLocal()
@@ -46,11 +70,16 @@ def get_db():
     finally:
         db.close()
 
+# Dependencia async: para handlers `async def` que hacen `await` de sus consultas
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # Función para verificar la conexión
 def test_connection():
     try:
         with engine.connect() as connection:
-            result = connection.execute("SELECT 1")
+            connection.execute(text("SELECT 1"))
             print("✅ Conexión a MySQL exitosa")
             return True
     except Exception as e:
@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import select
+
+import database
+from models import Profesora
+
+# Configuración desde .env
+EPOCAS_REFRESCO_SEGUNDOS = int(os.getenv("EPOCAS_REFRESCO_SEGUNDOS", "30"))
+
+
+class MapaEpocas:
+    """Época de token vigente por profesora, en memoria.
+
+    Un token con claims completos solo vale si su claim `ep` coincide con la época de la
+    profesora. Al desactivarla, quitarle el rol de admin o cambiarle la contraseña se
+    incrementa `Profesora.token_epoch`, y con eso sus tokens anteriores dejan de servir sin
+    consultar la base. El mapa se recarga cada EPOCAS_REFRESCO_SEGUNDOS para enterarse de
+    los cambios hechos en otros workers.
+    """
+
+    def __init__(self, refresco: int):
+        self.refresco = refresco
+        self._epocas = {}
+        self._cargado_en = None
+        self._lock = threading.Lock()
+
+    def _recargar(self):
+        db = database.SessionLocal()
+        try:
+            epocas = dict(db.execute(select(Profesora.id, Profesora.token_epoch)).all())
+        finally:
+            db.close()
+        with self._lock:
+            self._epocas = {pid: epoca or 0 for pid, epoca in epocas.items()}
+            self._cargado_en = time.monotonic()
+
+    def epoca(self, profesora_id: int) -> Optional[int]:
+        if self._cargado_en is None or time.monotonic() - self._cargado_en > self.refresco:
+            self._recargar()
+        return self._epocas.get(profesora_id)
+
+    def fijar(self, profesora_id: int, epoca: int):
+        with self._lock:
+            self._epocas[profesora_id] = epoca
+
+    def quitar(self, profesora_id: int):
+        with self._lock:
+            self._epocas.pop(profesora_id, None)
+
+
+mapa_epocas = MapaEpocas(EPOCAS_REFRESCO_SEGUNDOS)
+
+
+def revocar_tokens(profesora) -> int:
+    """Incrementar la época de la profesora (antes del commit) para invalidar sus tokens"""
+    profesora.token_epoch = (profesora.token_epoch or 0) + 1
+    return profesora.token_epoch
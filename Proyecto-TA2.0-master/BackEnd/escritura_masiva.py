@@ -0,0 +1,60 @@
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import Asistencia
+
+# Filas por sentencia INSERT multi-fila (evita paquetes demasiado grandes en MySQL)
+TAMANO_LOTE = 500
+
+
+def _lotes(filas: list, tamano: int = TAMANO_LOTE):
+    for i in range(0, len(filas), tamano):
+        yield filas[i:i + tamano]
+
+
+def insertar_lotes(db: Session, tabla, filas: list):
+    """INSERT multi-fila por lotes, sin resolver conflictos."""
+    for lote in _lotes(filas):
+        db.execute(tabla.insert().values(lote))
+
+
+def insertar_o_actualizar(db: Session, tabla, filas: list, columnas_actualizar: list, columnas_clave: list):
+    """INSERT multi-fila con ON DUPLICATE KEY UPDATE (o ON CONFLICT en SQLite) por lotes.
+
+    `columnas_clave` solo se usa en SQLite, donde hay que nombrar el índice único en conflicto;
+    MySQL resuelve el conflicto contra cualquier clave única de la tabla.
+    """
+    if not filas:
+        return
+
+    dialecto = db.get_bind().dialect.name
+
+    for lote in _lotes(filas):
+        if dialecto == "sqlite":
+            stmt = sqlite_insert(tabla).values(lote)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=columnas_clave,
+                set_={c: stmt.excluded[c] for c in columnas_actualizar}
+            )
+        else:
+            stmt = mysql_insert(tabla).values(lote)
+            stmt = stmt.on_duplicate_key_update(
+                {c: stmt.inserted[c] for c in columnas_actualizar}
+            )
+        db.execute(stmt)
+
+
+def upsert_asistencias(db: Session, filas: list):
+    """Insertar o actualizar asistencias contra la clave única `_aprendiz_fecha_uc`.
+
+    Cada fila es un dict con aprendiz_id, fecha, presente y profesora_id. En filas ya
+    existentes solo se actualiza `presente`, igual que en los endpoints individuales.
+    """
+    insertar_o_actualizar(
+        db,
+        Asistencia.__table__,
+        filas,
+        columnas_actualizar=["presente"],
+        columnas_clave=["aprendiz_id", "fecha"]
+    )
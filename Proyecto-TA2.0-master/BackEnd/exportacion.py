@@ -0,0 +1,126 @@
+import csv
+import io
+import tempfile
+from typing import Iterator, List
+
+import openpyxl
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from metricas import contar_exportacion
+from models import Aprendiz, Asistencia
+
+# Filas que se leen del cursor del servidor en cada viaje
+FILAS_POR_LECTURA = 500
+# Filas del CSV que se acumulan antes de enviar un fragmento
+FILAS_POR_FRAGMENTO = 200
+# Tamaño hasta el que el XLSX generado se queda en memoria antes de pasar a disco
+XLSX_MAX_MEMORIA = 5 * 1024 * 1024
+BYTES_POR_FRAGMENTO = 64 * 1024
+
+MEDIA_TYPE_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def fechas_exportables(db: Session, profesora_id: int) -> list:
+    """Fechas distintas con asistencia registrada para los aprendices de la profesora"""
+    return list(db.execute(
+        select(Asistencia.fecha)
+        .join(Aprendiz, Aprendiz.id == Asistencia.aprendiz_id)
+        .where(Aprendiz.profesora_id == profesora_id)
+        .distinct()
+        .order_by(Asistencia.fecha)
+    ).scalars())
+
+
+def tiene_aprendices(db: Session, profesora_id: int) -> bool:
+    return db.execute(
+        select(Aprendiz.id).where(Aprendiz.profesora_id == profesora_id).limit(1)
+    ).first() is not None
+
+
+def filas_matriz(db: Session, profesora_id: int, fechas: list) -> Iterator[List]:
+    """Generar la matriz NOMBRES/DOCUMENTO/fechas/TOTAL/PORCENTAJE fila a fila.
+
+    La primera fila es el encabezado. Los datos salen de una sola consulta ordenada por
+    aprendiz y fecha, leída por tandas desde el servidor y pivotada al vuelo.
+    """
+    yield ["NOMBRES", "DOCUMENTO"] + [f.strftime("%d/%m/%Y") for f in fechas] + ["TOTAL", "PORCENTAJE"]
+
+    posiciones = {f: i for i, f in enumerate(fechas)}
+    resultado = db.execute(
+        select(Aprendiz.id, Aprendiz.nombre, Aprendiz.documento, Asistencia.fecha, Asistencia.presente)
+        .outerjoin(Asistencia, Asistencia.aprendiz_id == Aprendiz.id)
+        .where(Aprendiz.profesora_id == profesora_id)
+        .order_by(Aprendiz.id, Asistencia.fecha)
+        .execution_options(yield_per=FILAS_POR_LECTURA)
+    )
+
+    actual_id = None
+    fila = None
+    exportadas = 0
+    try:
+        for aprendiz_id, nombre, documento, fecha, presente in resultado:
+            if aprendiz_id != actual_id:
+                if fila is not None:
+                    yield _cerrar_fila(fila, len(fechas))
+                    exportadas += 1
+                actual_id = aprendiz_id
+                fila = [nombre, documento or ""] + [""] * len(fechas)
+
+            if presente and fecha in posiciones:
+                fila[2 + posiciones[fecha]] = "X"
+
+        if fila is not None:
+            yield _cerrar_fila(fila, len(fechas))
+            exportadas += 1
+    finally:
+        # También si el cliente corta la descarga a la mitad
+        contar_exportacion(exportadas)
+
+
+def _cerrar_fila(fila: list, total_fechas: int) -> list:
+    total_presentes = fila[2:].count("X")
+    porcentaje = (total_presentes / total_fechas * 100) if total_fechas else 0
+    return fila + [total_presentes, f"{porcentaje:.1f}%"]
+
+
+def csv_en_fragmentos(filas: Iterator[List]) -> Iterator[str]:
+    """Convertir filas a texto CSV, entregando un fragmento cada FILAS_POR_FRAGMENTO filas"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    pendientes = 0
+    for fila in filas:
+        writer.writerow(fila)
+        pendientes += 1
+        if pendientes >= FILAS_POR_FRAGMENTO:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pendientes = 0
+    if pendientes:
+        yield buffer.getvalue()
+
+
+def xlsx_en_fragmentos(filas: Iterator[List]) -> Iterator[bytes]:
+    """Escribir las filas en un libro XLSX de solo escritura y entregarlo por fragmentos.
+
+    openpyxl en modo write_only no guarda las celdas en memoria; el libro terminado va a un
+    archivo temporal que solo pasa a disco si supera XLSX_MAX_MEMORIA.
+    """
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet("Asistencia")
+    for fila in filas:
+        # Celdas vacías en lugar de textos vacíos, igual que una hoja hecha a mano
+        hoja.append([None if valor == "" else valor for valor in fila])
+
+    archivo = tempfile.SpooledTemporaryFile(max_size=XLSX_MAX_MEMORIA)
+    try:
+        libro.save(archivo)
+        archivo.seek(0)
+        while True:
+            fragmento = archivo.read(BYTES_POR_FRAGMENTO)
+            if not fragmento:
+                break
+            yield fragmento
+    finally:
+        archivo.close()
@@ -0,0 +1,347 @@
+from datetime import datetime, date
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import openpyxl
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Aprendiz, Asistencia
+from escritura_masiva import insertar_lotes, upsert_asistencias
+from resumen_asistencia import actualizar_resumen
+from resumen_diario import actualizar_diario
+from riesgo_aprendices import registrar_asistencias
+from versiones_datos import RECURSO_APRENDICES, RECURSO_ASISTENCIAS, incrementar_version
+
+# Filas de la hoja que se resuelven y escriben juntas
+FILAS_POR_LOTE = 200
+
+NOMBRE_CANDIDATOS = ["NOMBRES", "NOMBRE", "Nombres", "Nombre"]
+# Largo de las columnas: un valor más largo se truncaría (MySQL) o rechazaría al insertarlo
+LARGO_NOMBRE = Aprendiz.__table__.c.nombre.type.length
+LARGO_DOCUMENTO = Aprendiz.__table__.c.documento.type.length
+VALORES_PRESENTE = ("x", "1", "true", "si", "sí", "y", "yes")
+
+
+class ColumnasHoja(NamedTuple):
+    nombre: int
+    documento: Optional[int]
+    fechas: List[Tuple[int, date]]
+
+
+def _parse_date_col(col):
+    """Helper function para parsear fechas de diferentes formatos"""
+    if isinstance(col, datetime):
+        return col.date()
+    if isinstance(col, date):
+        return col
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(str(col), fmt).date()
+        except Exception:
+            continue
+    return None
+
+
+def _es_vacio(val) -> bool:
+    # None (openpyxl) o NaN (pandas)
+    return val is None or val != val or val == ''
+
+
+def _texto_celda(val) -> Optional[str]:
+    if _es_vacio(val):
+        return None
+    texto = str(val).strip()
+    if not texto or texto.lower() == 'nan':
+        return None
+    return texto
+
+
+def valor_presente(val) -> bool:
+    """Interpretar el contenido de una celda de fecha como presente/ausente"""
+    if _es_vacio(val):
+        return False
+    s = str(val).strip().lower()
+    if s in VALORES_PRESENTE:
+        return True
+    try:
+        return float(val) != 0
+    except (ValueError, TypeError):
+        # Si hay algún valor, considerar presente
+        return bool(s)
+
+
+def detectar_columnas(encabezados: list) -> ColumnasHoja:
+    """Ubicar las columnas de nombre, DOCUMENTO y fechas a partir de la fila de encabezados"""
+    nombre_idx = 0
+    for cand in NOMBRE_CANDIDATOS:
+        if cand in encabezados:
+            nombre_idx = encabezados.index(cand)
+            break
+
+    documento_idx = encabezados.index("DOCUMENTO") if "DOCUMENTO" in encabezados else None
+
+    fechas = []
+    for idx, col in enumerate(encabezados):
+        fecha_parsed = _parse_date_col(col)
+        if fecha_parsed:
+            fechas.append((idx, fecha_parsed))
+
+    return ColumnasHoja(nombre_idx, documento_idx, fechas)
+
+
+def _filas_openpyxl(libro) -> Iterator[tuple]:
+    try:
+        hoja = libro.active
+        yield from hoja.iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+
+def _abrir_openpyxl(archivo) -> Tuple[list, Iterator[tuple]]:
+    # read_only: las filas se leen del XML a medida que se consumen
+    libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    filas = _filas_openpyxl(libro)
+    encabezados = next(filas, None)
+    if encabezados is None:
+        libro.close()
+        raise ValueError("La hoja está vacía")
+    return list(encabezados), filas
+
+
+def _abrir_pandas(archivo) -> Tuple[list, Iterator[tuple]]:
+    # Respaldo para formatos que openpyxl no lee (.xls, .ods...); carga la hoja completa
+    import pandas as pd
+
+    archivo.seek(0)
+    df = pd.read_excel(archivo)
+    return list(df.columns), df.itertuples(index=False, name=None)
+
+
+def abrir_hoja(archivo) -> Tuple[list, Iterator[tuple]]:
+    """Abrir una hoja de cálculo y devolver (encabezados, iterador de filas como tuplas).
+
+    Se usa openpyxl en modo solo lectura para que la memoria no dependa del tamaño del
+    archivo; pandas queda solo como respaldo.
+    """
+    try:
+        return _abrir_openpyxl(archivo)
+    except Exception:
+        return _abrir_pandas(archivo)
+
+
+def lotes(filas: Iterable[tuple], tamano: int = FILAS_POR_LOTE) -> Iterator[list]:
+    """Agrupar filas en listas de `tamano` elementos como máximo"""
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+class ImportacionAsistencia:
+    """Importa filas de una hoja de asistencia resolviendo todo en memoria.
+
+    Al crearla se cargan, con una consulta cada uno, los aprendices de la profesora y las
+    asistencias ya registradas en el rango de fechas de la hoja. Las filas se procesan en
+    lotes de FILAS_POR_LOTE: los aprendices nuevos y las asistencias se escriben con INSERT
+    multi-fila. No hace commit; eso le corresponde a quien la usa.
+    """
+
+    def __init__(self, db: Session, profesora_id: int, columnas: ColumnasHoja):
+        self.db = db
+        self.profesora_id = profesora_id
+        self.columnas = columnas
+
+        self.filas_procesadas = 0
+        self.aprendices_creados = 0
+        self.asistencias_creadas = 0
+        self.asistencias_actualizadas = 0
+        self.errores = []
+
+        self._por_documento = {}
+        self._por_nombre = {}
+        self._max_id = 0
+        self._cargar_aprendices()
+
+        self._existentes = {}  # (aprendiz_id, fecha) -> profesora_id que la registró
+        self._cargar_asistencias()
+
+    def _cargar_aprendices(self):
+        filas = self.db.execute(
+            select(Aprendiz.id, Aprendiz.nombre, Aprendiz.documento)
+            .where(Aprendiz.profesora_id == self.profesora_id)
+            .order_by(Aprendiz.id)
+        ).all()
+        for aprendiz_id, nombre, documento in filas:
+            self._registrar(aprendiz_id, nombre, documento)
+            self._max_id = max(self._max_id, aprendiz_id)
+
+    def _registrar(self, ref, nombre, documento):
+        if documento:
+            self._por_documento.setdefault(documento, ref)
+        self._por_nombre.setdefault(nombre, ref)
+
+    def _cargar_asistencias(self):
+        fechas = {f for _, f in self.columnas.fechas}
+        if not fechas:
+            return
+        filas = self.db.execute(
+            select(Asistencia.aprendiz_id, Asistencia.fecha, Asistencia.profesora_id)
+            .join(Aprendiz, Aprendiz.id == Asistencia.aprendiz_id)
+            .where(
+                Aprendiz.profesora_id == self.profesora_id,
+                Asistencia.fecha >= min(fechas),
+                Asistencia.fecha <= max(fechas)
+            )
+        ).all()
+        self._existentes = {
+            (aprendiz_id, fecha): profesora_id
+            for aprendiz_id, fecha, profesora_id in filas if fecha in fechas
+        }
+
+    def procesar(self, filas: Iterable[tuple]):
+        """Procesar filas de datos (tuplas alineadas con los encabezados), en lotes"""
+        for lote in lotes(filas):
+            self.procesar_lote(lote)
+
+    def procesar_lote(self, lote: list):
+        nuevos = []  # [(nombre, documento, numero_fila)] en orden de aparición
+        pendientes = []  # [(ref, fecha, presente)]
+
+        for fila in lote:
+            self.filas_procesadas += 1
+            numero_fila = self.filas_procesadas + 1  # la fila 1 es el encabezado
+            try:
+                nombre = _texto_celda(fila[self.columnas.nombre]) if self.columnas.nombre < len(fila) else None
+                if not nombre:
+                    continue
+
+                documento = None
+                if self.columnas.documento is not None and self.columnas.documento < len(fila):
+                    documento = _texto_celda(fila[self.columnas.documento])
+
+                if len(nombre) > LARGO_NOMBRE:
+                    raise ValueError(f"el nombre supera los {LARGO_NOMBRE} caracteres")
+                if documento and len(documento) > LARGO_DOCUMENTO:
+                    raise ValueError(f"el documento supera los {LARGO_DOCUMENTO} caracteres")
+
+                # Buscar aprendiz por documento y luego por nombre
+                ref = None
+                if documento:
+                    ref = self._por_documento.get(documento)
+                if ref is None:
+                    ref = self._por_nombre.get(nombre)
+                if ref is None:
+                    # Referencia negativa provisional hasta conocer el id real
+                    ref = -(len(nuevos) + 1)
+                    nuevos.append((nombre, documento, numero_fila))
+                    self._registrar(ref, nombre, documento)
+
+                for idx, fecha in self.columnas.fechas:
+                    val = fila[idx] if idx < len(fila) else None
+                    pendientes.append((ref, fecha, valor_presente(val)))
+
+            except Exception as e:
+                self.errores.append(f"Error procesando fila {numero_fila}: {str(e)}")
+
+        ids_nuevos = self._crear_aprendices(nuevos)
+
+        asistencias = {}
+        for ref, fecha, presente in pendientes:
+            aprendiz_id = ids_nuevos.get(ref) if ref < 0 else ref
+            if aprendiz_id is None:
+                # Aprendiz nuevo que no se pudo identificar; ya quedó en self.errores
+                continue
+            clave = (aprendiz_id, fecha)
+            if clave in self._existentes:
+                self.asistencias_actualizadas += 1
+            else:
+                self._existentes[clave] = self.profesora_id
+                self.asistencias_creadas += 1
+            asistencias[clave] = presente
+
+        upsert_asistencias(self.db, [
+            {
+                "aprendiz_id": aprendiz_id,
+                "fecha": fecha,
+                "presente": presente,
+                "profesora_id": self.profesora_id
+            }
+            for (aprendiz_id, fecha), presente in asistencias.items()
+        ])
+        actualizar_resumen(self.db, [aprendiz_id for aprendiz_id, _ in asistencias])
+        actualizar_diario(self.db, [(self.profesora_id, fecha) for _, fecha in asistencias])
+        registrar_asistencias(self.db, [(aprendiz_id, fecha, presente) for (aprendiz_id, fecha), presente in asistencias.items()])
+        incrementar_version(self.db, RECURSO_ASISTENCIAS, {self.profesora_id, *(self._existentes[clave] for clave in asistencias)})
+        if ids_nuevos:
+            incrementar_version(self.db, RECURSO_APRENDICES, [self.profesora_id])
+
+    def _crear_aprendices(self, nuevos: list) -> dict:
+        """Insertar aprendices nuevos en bloque y devolver {ref provisional: id}.
+
+        Las refs que no aparecen en el resultado no se pudieron identificar después del
+        INSERT; quedan en self.errores y sus asistencias no se escriben.
+        """
+        if not nuevos:
+            return {}
+
+        insertar_lotes(self.db, Aprendiz.__table__, [
+            {"nombre": nombre, "documento": documento, "profesora_id": self.profesora_id}
+            for nombre, documento, _ in nuevos
+        ])
+
+        # Los ids autoincrementales quedan por encima de todo lo ya cargado. Se buscan solo
+        # los pares (nombre, documento) recién insertados: un aprendiz con el mismo nombre
+        # creado a la vez para la profesora (POST /aprendices durante una importación en
+        # segundo plano) no debe quedarse con las asistencias de la hoja.
+        refs = {(nombre, documento): -(i + 1) for i, (nombre, documento, _) in enumerate(nuevos)}
+        creados = self.db.execute(
+            select(Aprendiz.id, Aprendiz.nombre, Aprendiz.documento)
+            .where(
+                Aprendiz.profesora_id == self.profesora_id,
+                Aprendiz.id > self._max_id,
+                Aprendiz.nombre.in_([nombre for nombre, _, _ in nuevos])
+            )
+            .order_by(Aprendiz.id)
+        ).all()
+        ids = {}
+        for aprendiz_id, nombre, documento in creados:
+            ref = refs.get((nombre, documento))
+            if ref is not None and ref not in ids:
+                ids[ref] = aprendiz_id
+                self._max_id = max(self._max_id, aprendiz_id)
+
+        self.aprendices_creados += len(ids)
+
+        for i, (nombre, documento, numero_fila) in enumerate(nuevos):
+            ref = -(i + 1)
+            aprendiz_id = ids.get(ref)
+            if aprendiz_id is None:
+                # El valor guardado no coincide con el enviado (collation, espacios, etc.)
+                self.errores.append(f"Error procesando fila {numero_fila}: no se pudo identificar "
+                                    f"al aprendiz '{nombre}' después de crearlo; se omiten sus asistencias")
+            # Sin id real la ref provisional no debe quedar en los índices: el próximo lote
+            # vuelve a usar las mismas refs negativas
+            if documento and self._por_documento.get(documento) == ref:
+                if aprendiz_id is None:
+                    del self._por_documento[documento]
+                else:
+                    self._por_documento[documento] = aprendiz_id
+            if self._por_nombre.get(nombre) == ref:
+                if aprendiz_id is None:
+                    del self._por_nombre[nombre]
+                else:
+                    self._por_nombre[nombre] = aprendiz_id
+        return ids
+
+    def resumen(self) -> dict:
+        return {
+            "aprendices_creados": self.aprendices_creados,
+            "asistencias_creadas": self.asistencias_creadas,
+            "asistencias_actualizadas": self.asistencias_actualizadas,
+            "fechas_procesadas": len(self.columnas.fechas),
+            "errores": self.errores
+        }
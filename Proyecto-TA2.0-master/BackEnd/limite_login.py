@@ -0,0 +1,216 @@
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+
+from fastapi import HTTPException, Request, status
+
+# Configuración desde .env
+LOGIN_VENTANA_SEGUNDOS = int(os.getenv("LOGIN_VENTANA_SEGUNDOS", "300"))
+LOGIN_MAX_POR_EMAIL = int(os.getenv("LOGIN_MAX_POR_EMAIL", "5"))
+LOGIN_MAX_POR_IP = int(os.getenv("LOGIN_MAX_POR_IP", "30"))
+# "memoria" (un contador por worker) o "redis" (compartido entre workers, usa REDIS_URL)
+LOGIN_LIMITE_BACKEND = os.getenv("LOGIN_LIMITE_BACKEND", "memoria").lower()
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Si Redis no responde en este tiempo el intento se cuenta en memoria; el login no se queda esperando
+REDIS_TIMEOUT_SEGUNDOS = float(os.getenv("REDIS_TIMEOUT_SEGUNDOS", "0.5"))
+# Solo detrás de un proxy propio: tomar la IP del cliente de X-Forwarded-For
+LOGIN_CONFIAR_PROXY = os.getenv("LOGIN_CONFIAR_PROXY", "false").lower() == "true"
+# Cuántos proxies propios agregan su entrada a X-Forwarded-For delante de la app
+LOGIN_PROXIES_CONFIABLES = max(1, int(os.getenv("LOGIN_PROXIES_CONFIABLES", "1")))
+
+
+class VentanaMemoria:
+    """Ventana deslizante en memoria: (marca de tiempo, id) de los intentos aceptados por clave"""
+
+    def __init__(self):
+        self._intentos = defaultdict(deque)
+        self._lock = threading.Lock()
+        self._ultima_purga = time.monotonic()
+
+    def _purgar(self, ahora: float, ventana: int):
+        # Quitar claves sin intentos recientes para que el dict no crezca sin límite
+        for clave in [c for c, d in self._intentos.items() if not d or d[-1][0] <= ahora - ventana]:
+            del self._intentos[clave]
+        self._ultima_purga = ahora
+
+    async def registrar(self, clave: str, limite: int, ventana: int, intento: str) -> float:
+        """Registrar un intento. Devuelve 0 si se acepta o los segundos hasta poder reintentar"""
+        ahora = time.monotonic()
+        with self._lock:
+            if ahora - self._ultima_purga > ventana:
+                self._purgar(ahora, ventana)
+            intentos = self._intentos[clave]
+            while intentos and intentos[0][0] <= ahora - ventana:
+                intentos.popleft()
+            if len(intentos) >= limite:
+                return intentos[0][0] + ventana - ahora
+            intentos.append((ahora, intento))
+            return 0
+
+    async def quitar(self, clave: str, intento: str):
+        """Descontar un intento ya registrado"""
+        with self._lock:
+            intentos = self._intentos.get(clave)
+            if intentos:
+                for registro in intentos:
+                    if registro[1] == intento:
+                        intentos.remove(registro)
+                        break
+
+    async def limpiar(self, clave: str):
+        with self._lock:
+            self._intentos.pop(clave, None)
+
+
+# Recortar, contar, agregar y poner la expiración en un solo paso atómico: con dos viajes
+# separados, intentos simultáneos en varios workers leerían el mismo conteo y pasarían todos.
+# Devuelve texto porque Redis trunca a entero los números de Lua.
+_SCRIPT_REGISTRAR = """
+local ahora = tonumber(ARGV[1])
+local ventana = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ahora - ventana)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    local primero = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return tostring(tonumber(primero[2]) + ventana - ahora)
+end
+redis.call('ZADD', KEYS[1], ahora, ARGV[4])
+redis.call('EXPIRE', KEYS[1], ventana)
+return '0'
+"""
+
+
+class VentanaRedis:
+    """La misma ventana deslizante sobre un sorted set de Redis, compartida entre workers.
+
+    Usa el cliente async para no bloquear el event loop. Si Redis falla o tarda más de
+    REDIS_TIMEOUT_SEGUNDOS, ese intento se cuenta en la ventana en memoria del worker.
+    """
+
+    def __init__(self, url: str):
+        import redis
+        import redis.asyncio
+
+        opciones = {"socket_timeout": REDIS_TIMEOUT_SEGUNDOS, "socket_connect_timeout": REDIS_TIMEOUT_SEGUNDOS}
+        # Verificación al arrancar (todavía no hay event loop) con un cliente sync que se cierra enseguida
+        verificacion = redis.Redis.from_url(url, **opciones)
+        try:
+            verificacion.ping()
+        finally:
+            verificacion.close()
+
+        self._redis = redis.asyncio.Redis.from_url(url, **opciones)
+        self._script = self._redis.register_script(_SCRIPT_REGISTRAR)
+        self._respaldo = VentanaMemoria()
+        self._ultimo_aviso = 0.0
+
+    def _fallo(self, e: Exception):
+        # Un aviso por minuto como mucho mientras Redis siga caído
+        ahora = time.monotonic()
+        if ahora - self._ultimo_aviso > 60:
+            self._ultimo_aviso = ahora
+            print(f"⚠️  Límite de login: Redis no respondió ({e}), se cuenta en memoria")
+
+    async def registrar(self, clave: str, limite: int, ventana: int, intento: str) -> float:
+        try:
+            espera = await self._script(keys=[f"login:{clave}"], args=[time.time(), ventana, limite, intento])
+        except Exception as e:
+            self._fallo(e)
+            return await self._respaldo.registrar(clave, limite, ventana, intento)
+        return float(espera)
+
+    async def quitar(self, clave: str, intento: str):
+        await self._respaldo.quitar(clave, intento)
+        try:
+            await self._redis.zrem(f"login:{clave}", intento)
+        except Exception as e:
+            self._fallo(e)
+
+    async def limpiar(self, clave: str):
+        await self._respaldo.limpiar(clave)
+        try:
+            await self._redis.delete(f"login:{clave}")
+        except Exception as e:
+            self._fallo(e)
+
+
+def _crear_ventana():
+    if LOGIN_LIMITE_BACKEND == "redis":
+        try:
+            return VentanaRedis(REDIS_URL)
+        except Exception as e:
+            print(f"❌ Límite de login: no se pudo usar Redis ({e}), se usa memoria por worker")
+    return VentanaMemoria()
+
+
+class LimiteLogin:
+    """Límite de intentos de login por email y por IP.
+
+    Se consulta antes de tocar la base o bcrypt, así que un ataque de fuerza bruta o de
+    credential stuffing recibe 429 sin gastar CPU. Un login correcto borra el contador del
+    email y descuenta su propio intento del de la IP: la IP solo acumula intentos fallidos, así
+    los logins correctos de un colegio detrás de un solo NAT no se bloquean entre sí.
+    """
+
+    def __init__(self):
+        self._ventana = _crear_ventana()
+        self._lock = threading.Lock()
+        self.intentos = 0
+        self.bloqueados_email = 0
+        self.bloqueados_ip = 0
+
+    def _bloquear(self, contador: str, espera: float):
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + 1)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiados intentos de inicio de sesión, intenta más tarde",
+            headers={"Retry-After": str(max(1, int(espera + 0.999)))},
+        )
+
+    async def verificar(self, request: Request, email: str) -> str:
+        """Registrar el intento o lanzar 429 si el email o la IP superaron el límite.
+
+        Devuelve el id del intento, para pasarlo a login_correcto si la contraseña es válida.
+        """
+        with self._lock:
+            self.intentos += 1
+        intento = uuid.uuid4().hex
+        espera = await self._ventana.registrar(f"ip:{ip_cliente(request)}", LOGIN_MAX_POR_IP, LOGIN_VENTANA_SEGUNDOS, intento)
+        if espera:
+            self._bloquear("bloqueados_ip", espera)
+        espera = await self._ventana.registrar(f"email:{email.strip().lower()}", LOGIN_MAX_POR_EMAIL, LOGIN_VENTANA_SEGUNDOS, intento)
+        if espera:
+            self._bloquear("bloqueados_email", espera)
+        return intento
+
+    async def login_correcto(self, request: Request, email: str, intento: str):
+        await self._ventana.limpiar(f"email:{email.strip().lower()}")
+        await self._ventana.quitar(f"ip:{ip_cliente(request)}", intento)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "backend": type(self._ventana).__name__,
+                "intentos": self.intentos,
+                "bloqueados_email": self.bloqueados_email,
+                "bloqueados_ip": self.bloqueados_ip
+            }
+
+
+def ip_cliente(request: Request) -> str:
+    """IP del cliente; detrás de proxies propios, la que agregó el más externo de ellos.
+
+    Los proxies (p. ej. nginx con $proxy_add_x_forwarded_for) agregan la dirección que ven a
+    la derecha de X-Forwarded-For. Lo de la izquierda lo manda el cliente y puede ser
+    cualquier cosa, así que se cuenta LOGIN_PROXIES_CONFIABLES entradas desde la derecha.
+    """
+    if LOGIN_CONFIAR_PROXY:
+        entradas = [e.strip() for e in ",".join(request.headers.getlist("x-forwarded-for")).split(",") if e.strip()]
+        if len(entradas) >= LOGIN_PROXIES_CONFIABLES:
+            return entradas[-LOGIN_PROXIES_CONFIABLES]
+    return request.client.host if request.client else "desconocida"
+
+
+limite_login = LimiteLogin()
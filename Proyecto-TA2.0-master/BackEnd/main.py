@@ -4,15 +4,33 @@ import uvicorn
 from dotenv import load_dotenv
 
 # Importaciones locales
-from database import engine
+from database import async_engine, engine
 from models import Base
 from startup_admin import ensure_admin
+from migraciones import aplicar_migraciones
+from salud import sonda_salud
+from respuestas_json import clase_respuesta_por_defecto
+from compresion import CompresionMiddleware
+from metricas import MetricasMiddleware, instrumentar_motor
 
-# Crear las tablas
+# Crear las tablas y aplicar migraciones pendientes
 Base.metadata.create_all(bind=engine)
+aplicar_migraciones(engine)
 
 # Inicializar FastAPI
-app = FastAPI(title="Sistema de Asistencia TecnoAcademia")
+app = FastAPI(
+    title="Sistema de Asistencia TecnoAcademia",
+    default_response_class=clase_respuesta_por_defecto()
+)
+
+# Verificación periódica de la base para /health
+@app.on_event("startup")
+async def iniciar_sonda_salud():
+    sonda_salud.iniciar()
+
+@app.on_event("shutdown")
+async def detener_sonda_salud():
+    await sonda_salud.detener()
 
 # Configurar CORS
 app.add_middleware(
@@ -23,6 +41,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Comprimir respuestas (gzip, y brotli/zstd si están instalados)
+app.add_middleware(CompresionMiddleware)
+
+# Métricas para /metrics; va al final para quedar por fuera y medir la petición completa
+app.add_middleware(MetricasMiddleware)
+instrumentar_motor(engine, "sync")
+instrumentar_motor(async_engine.sync_engine, "async")
+
 # Incluir todos los routers
 from routers.asistencia import router as asistencia_router
 from routers.aprendices import router as aprendices_router
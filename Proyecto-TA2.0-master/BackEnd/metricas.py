@@ -0,0 +1,281 @@
+"""Métricas en formato de texto de Prometheus para GET /metrics.
+
+- Peticiones y latencia por grupo de rutas (el prefijo del router: /asistencia, /clases,
+  /aprendices...). El middleware ASGI se registra en main.py como el más externo, así la
+  latencia incluye la compresión y el envío completo de las StreamingResponse.
+- Sentencias SQL y tiempo en la base por petición, con los eventos before/after_cursor_execute
+  de los motores. La petición en curso se sigue con un ContextVar, que también llega a los
+  handlers sync (threadpool) y a los generadores de las StreamingResponse.
+- Espera para obtener una conexión del pool.
+- Filas importadas y exportadas.
+
+Todos los contadores e histogramas se crean al importar el módulo y se indexan por número de
+grupo; en cada petición solo se suman enteros. Las etiquetas se arman al generar el texto.
+"""
+import hmac
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from salud import estadisticas_pool
+
+# Configuración desde .env
+# Si está definido, GET /metrics pide "Authorization: Bearer <token>"
+METRICAS_TOKEN = os.getenv("METRICAS_TOKEN", "")
+
+TIPO_CONTENIDO = "text/plain; version=0.0.4"
+
+# Grupos de rutas: primer segmento del path -> etiqueta
+GRUPOS = (
+    "/asistencia", "/aprendices", "/clases", "/admin/profesoras", "/profesoras", "/estadisticas",
+    "/login", "/register", "/me", "/health", "/metrics", "otros",
+)
+_INDICE_GRUPO = {grupo.split("/")[1]: i for i, grupo in enumerate(GRUPOS) if grupo.startswith("/")}
+GRUPO_OTROS = len(GRUPOS) - 1
+
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_SQL_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+LIMITES_SENTENCIAS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+LIMITES_ESPERA_POOL = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+CLASES_ESTADO = ("1xx", "2xx", "3xx", "4xx", "5xx")
+
+IMPORTACION_TIPOS = ("filas", "aprendices_creados", "asistencias_creadas", "asistencias_actualizadas", "errores")
+IMPORTACION_ESTADOS = ("completado", "error")
+
+# Un solo lock: los contadores se tocan desde el event loop, el threadpool y los hilos de importación
+_lock = threading.Lock()
+
+
+class Histograma:
+    __slots__ = ("limites", "cuentas", "suma", "total")
+
+    def __init__(self, limites: tuple):
+        self.limites = limites
+        self.cuentas = [0] * (len(limites) + 1)  # el último es +Inf
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        """Llamar con _lock tomado"""
+        self.cuentas[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+
+_peticiones = [[0] * len(CLASES_ESTADO) for _ in GRUPOS]
+_duracion = [Histograma(LIMITES_SEGUNDOS) for _ in GRUPOS]
+_sql_sentencias = [Histograma(LIMITES_SENTENCIAS) for _ in GRUPOS]
+_sql_segundos = [Histograma(LIMITES_SQL_SEGUNDOS) for _ in GRUPOS]
+# SQL fuera de una petición (importaciones en segundo plano, sonda de salud, migraciones)
+_sql_sin_peticion = [0, 0.0]
+_importacion_filas = [0] * len(IMPORTACION_TIPOS)
+_importacion_trabajos = [0] * len(IMPORTACION_ESTADOS)
+_exportacion_filas = [0]
+
+# nombre del motor -> (engine, histograma de espera del pool)
+_motores = {}
+
+
+def grupo_de_ruta(path: str) -> int:
+    fin = path.find("/", 1)
+    return _INDICE_GRUPO.get(path[1:fin] if fin > 0 else path[1:], GRUPO_OTROS)
+
+
+class _Peticion:
+    """Acumulado de una petición; lo comparten el middleware y los eventos SQL vía ContextVar"""
+    __slots__ = ("send", "grupo", "estado", "sentencias", "segundos_sql")
+
+    def __init__(self, send, grupo: int):
+        self.send = send
+        self.grupo = grupo
+        self.estado = 500  # si el handler lanza una excepción no llega a enviar la respuesta
+        self.sentencias = 0
+        self.segundos_sql = 0.0
+
+    async def enviar(self, message):
+        if message["type"] == "http.response.start":
+            self.estado = message["status"]
+        await self.send(message)
+
+
+_peticion_actual: ContextVar = ContextVar("peticion_metricas", default=None)
+
+
+class MetricasMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        peticion = _Peticion(send, grupo_de_ruta(scope["path"]))
+        token = _peticion_actual.set(peticion)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, peticion.enviar)
+        finally:
+            duracion = time.perf_counter() - inicio
+            _peticion_actual.reset(token)
+            g = peticion.grupo
+            clase = min(max(peticion.estado // 100, 1), 5) - 1
+            with _lock:
+                _peticiones[g][clase] += 1
+                _duracion[g].observar(duracion)
+                _sql_sentencias[g].observar(peticion.sentencias)
+                _sql_segundos[g].observar(peticion.segundos_sql)
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    conn.info["metricas_inicio"] = time.perf_counter()
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info.pop("metricas_inicio", None)
+    if inicio is None:
+        return
+    duracion = time.perf_counter() - inicio
+    peticion = _peticion_actual.get()
+    if peticion is not None:
+        # Solo el hilo que atiende la petición la modifica; se pasa al histograma al final
+        peticion.sentencias += 1
+        peticion.segundos_sql += duracion
+        return
+    with _lock:
+        _sql_sin_peticion[0] += 1
+        _sql_sin_peticion[1] += duracion
+
+
+def instrumentar_motor(engine, nombre: str):
+    """Registrar los eventos SQL y medir la espera del pool de un motor sync.
+
+    Para el motor async se pasa `async_engine.sync_engine`. La espera se mide envolviendo
+    `_do_get` del pool, que es lo que bloquea cuando no hay conexiones libres; SQLAlchemy no
+    tiene un evento para el inicio del checkout. Llamarla una sola vez por motor.
+    """
+    if nombre in _motores:
+        return
+    espera = Histograma(LIMITES_ESPERA_POOL)
+    _motores[nombre] = (engine, espera)
+
+    event.listen(engine, "before_cursor_execute", _antes_de_ejecutar)
+    event.listen(engine, "after_cursor_execute", _despues_de_ejecutar)
+
+    pool = engine.pool
+    obtener = pool._do_get
+
+    def _do_get():
+        inicio = time.perf_counter()
+        try:
+            return obtener()
+        finally:
+            duracion = time.perf_counter() - inicio
+            with _lock:
+                espera.observar(duracion)
+
+    pool._do_get = _do_get
+
+
+def contar_importacion(importacion, ok: bool):
+    """Sumar las filas de un trabajo de importación terminado (importacion puede ser None)"""
+    with _lock:
+        _importacion_trabajos[0 if ok else 1] += 1
+        if importacion is None:
+            return
+        valores = (
+            importacion.filas_procesadas, importacion.aprendices_creados, importacion.asistencias_creadas,
+            importacion.asistencias_actualizadas, len(importacion.errores),
+        )
+        for i, valor in enumerate(valores):
+            _importacion_filas[i] += valor
+
+
+def contar_exportacion(filas: int):
+    with _lock:
+        _exportacion_filas[0] += filas
+
+
+def autorizado(authorization) -> bool:
+    if not METRICAS_TOKEN:
+        return True
+    return hmac.compare_digest((authorization or "").encode(), f"Bearer {METRICAS_TOKEN}".encode())
+
+
+def _cabecera(lineas: list, nombre: str, tipo: str, ayuda: str):
+    lineas.append(f"# HELP {nombre} {ayuda}")
+    lineas.append(f"# TYPE {nombre} {tipo}")
+
+
+def _numero(valor) -> str:
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _histograma(lineas: list, nombre: str, etiquetas: str, h: Histograma):
+    acumulado = 0
+    for limite, cuenta in zip(h.limites, h.cuentas):
+        acumulado += cuenta
+        lineas.append(f'{nombre}_bucket{{{etiquetas},le="{_numero(float(limite))}"}} {acumulado}')
+    lineas.append(f'{nombre}_bucket{{{etiquetas},le="+Inf"}} {h.total}')
+    lineas.append(f"{nombre}_sum{{{etiquetas}}} {_numero(h.suma)}")
+    lineas.append(f"{nombre}_count{{{etiquetas}}} {h.total}")
+
+
+def exponer() -> str:
+    """Todas las métricas en el formato de texto 0.0.4 de Prometheus"""
+    lineas = []
+    with _lock:
+        _cabecera(lineas, "http_peticiones_total", "counter", "Peticiones HTTP por grupo de rutas y clase de estado")
+        for g, grupo in enumerate(GRUPOS):
+            for c, clase in enumerate(CLASES_ESTADO):
+                if _peticiones[g][c]:
+                    lineas.append(f'http_peticiones_total{{grupo="{grupo}",estado="{clase}"}} {_peticiones[g][c]}')
+
+        series = (
+            ("http_duracion_segundos", "Duración de la petición hasta enviar el último byte", _duracion),
+            ("sql_sentencias_por_peticion", "Sentencias SQL ejecutadas por petición", _sql_sentencias),
+            ("sql_segundos_por_peticion", "Tiempo en la base por petición", _sql_segundos),
+        )
+        for nombre, ayuda, histogramas in series:
+            _cabecera(lineas, nombre, "histogram", ayuda)
+            for g, grupo in enumerate(GRUPOS):
+                if histogramas[g].total:
+                    _histograma(lineas, nombre, f'grupo="{grupo}"', histogramas[g])
+
+        _cabecera(lineas, "sql_sentencias_sin_peticion_total", "counter",
+                  "Sentencias SQL fuera de una petición (importaciones, sonda de salud)")
+        lineas.append(f"sql_sentencias_sin_peticion_total {_sql_sin_peticion[0]}")
+        _cabecera(lineas, "sql_segundos_sin_peticion_total", "counter", "Tiempo en la base fuera de una petición")
+        lineas.append(f"sql_segundos_sin_peticion_total {_numero(_sql_sin_peticion[1])}")
+
+        _cabecera(lineas, "db_pool_espera_segundos", "histogram", "Espera para obtener una conexión del pool")
+        for nombre, (_, espera) in _motores.items():
+            _histograma(lineas, "db_pool_espera_segundos", f'motor="{nombre}"', espera)
+
+        _cabecera(lineas, "importacion_filas_total", "counter", "Resultado de las importaciones de Excel")
+        for i, tipo in enumerate(IMPORTACION_TIPOS):
+            lineas.append(f'importacion_filas_total{{tipo="{tipo}"}} {_importacion_filas[i]}')
+        _cabecera(lineas, "importacion_trabajos_total", "counter", "Trabajos de importación terminados")
+        for i, estado in enumerate(IMPORTACION_ESTADOS):
+            lineas.append(f'importacion_trabajos_total{{estado="{estado}"}} {_importacion_trabajos[i]}')
+        _cabecera(lineas, "exportacion_filas_total", "counter", "Filas de aprendices exportadas (CSV y XLSX)")
+        lineas.append(f"exportacion_filas_total {_exportacion_filas[0]}")
+
+    # Estado actual del pool, leído al momento
+    _cabecera(lineas, "db_pool_en_uso", "gauge", "Conexiones prestadas del pool")
+    for nombre, (engine, _) in _motores.items():
+        pool = estadisticas_pool(engine)
+        if "en_uso" in pool:
+            lineas.append(f'db_pool_en_uso{{motor="{nombre}"}} {pool["en_uso"]}')
+    _cabecera(lineas, "db_pool_esperando", "gauge", "Peticiones esperando una conexión del pool")
+    for nombre, (engine, _) in _motores.items():
+        pool = estadisticas_pool(engine)
+        if pool.get("esperando") is not None:
+            lineas.append(f'db_pool_esperando{{motor="{nombre}"}} {pool["esperando"]}')
+
+    return "\n".join(lineas) + "\n"
@@ -0,0 +1,140 @@
+"""Migraciones versionadas del esquema.
+
+`Base.metadata.create_all` crea tablas e índices nuevos en una base vacía, pero no toca
+tablas que ya existen. Los cambios sobre bases existentes van aquí, numerados; la versión
+aplicada se guarda en la tabla `schema_version`. Cada migración es idempotente.
+
+Uso: python migraciones.py
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection
+
+from models import (Aprendiz, Asistencia, Clase, ImportacionEstado, ResumenAsistencia, ResumenDiario,
+                    RiesgoAprendiz, VersionDatos)
+
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version", _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("descripcion", String(200), nullable=False),
+    Column("aplicada", DateTime, nullable=False),
+)
+
+
+def _crear_indices(conn: Connection, tabla):
+    """Crear los índices declarados en el modelo que falten (por nombre o por columnas)"""
+    existentes = inspect(conn).get_indexes(tabla.name)
+    nombres = {i["name"] for i in existentes}
+    columnas = {tuple(i["column_names"]) for i in existentes}
+
+    for indice in tabla.indexes:
+        if indice.name in nombres or tuple(c.name for c in indice.columns) in columnas:
+            continue
+        indice.create(bind=conn)
+        print(f"   + índice {indice.name} en {tabla.name}")
+
+
+def _m001_indices_consultas(conn: Connection):
+    for tabla in (Asistencia.__table__, Aprendiz.__table__, Clase.__table__):
+        _crear_indices(conn, tabla)
+
+
+def _m002_rellenar_resumen(conn: Connection):
+    from sqlalchemy.orm import Session
+    from resumen_asistencia import reconstruir_resumen
+
+    ResumenAsistencia.__table__.create(bind=conn, checkfirst=True)
+    if conn.execute(select(ResumenAsistencia.aprendiz_id).limit(1)).first() is None:
+        with Session(bind=conn) as db:
+            reconstruir_resumen(db)
+
+
+def _m003_token_epoch(conn: Connection):
+    columnas = {c["name"] for c in inspect(conn).get_columns("profesoras")}
+    if "token_epoch" not in columnas:
+        conn.execute(text("ALTER TABLE profesoras ADD COLUMN token_epoch INTEGER NOT NULL DEFAULT 0"))
+
+
+def _m004_resumen_diario(conn: Connection):
+    from sqlalchemy.orm import Session
+    from resumen_diario import reconstruir_diario
+
+    ResumenDiario.__table__.create(bind=conn, checkfirst=True)
+    if conn.execute(select(ResumenDiario.fecha).limit(1)).first() is None:
+        with Session(bind=conn) as db:
+            reconstruir_diario(db)
+
+
+def _m005_riesgo_aprendices(conn: Connection):
+    from sqlalchemy.orm import Session
+    from riesgo_aprendices import reconstruir_riesgo
+
+    RiesgoAprendiz.__table__.create(bind=conn, checkfirst=True)
+    if conn.execute(select(RiesgoAprendiz.aprendiz_id).limit(1)).first() is None:
+        with Session(bind=conn) as db:
+            reconstruir_riesgo(db)
+
+
+def _m006_versiones_datos(conn: Connection):
+    # Sin filas la versión es 0; la primera escritura de cada profesora crea la suya
+    VersionDatos.__table__.create(bind=conn, checkfirst=True)
+
+
+def _m007_resumen_diario_por_aprendiz(conn: Connection):
+    # resumen_diario pasa de quien registró la asistencia a la profesora del aprendiz
+    from sqlalchemy.orm import Session
+    from resumen_diario import reconstruir_diario
+
+    with Session(bind=conn) as db:
+        reconstruir_diario(db)
+
+
+def _m008_importaciones(conn: Connection):
+    ImportacionEstado.__table__.create(bind=conn, checkfirst=True)
+
+
+MIGRACIONES = [
+    (1, "Índices compuestos para las consultas frecuentes", _m001_indices_consultas),
+    (2, "Rellenar resumen_asistencias en bases existentes", _m002_rellenar_resumen),
+    (3, "Columna profesoras.token_epoch para revocar tokens", _m003_token_epoch),
+    (4, "Resumen diario de asistencia por profesora", _m004_resumen_diario),
+    (5, "Estado de riesgo por aprendiz", _m005_riesgo_aprendices),
+    (6, "Versiones de datos para ETag", _m006_versiones_datos),
+    (7, "Resumen diario por profesora del aprendiz", _m007_resumen_diario_por_aprendiz),
+    (8, "Estado de las importaciones compartido entre workers", _m008_importaciones),
+]
+
+
+def aplicar_migraciones(engine) -> int:
+    """Aplicar en orden las migraciones pendientes. Devuelve la versión final."""
+    schema_version.create(bind=engine, checkfirst=True)
+
+    with engine.connect() as conn:
+        actual = conn.execute(select(schema_version.c.version).order_by(schema_version.c.version.desc())).scalar() or 0
+
+    for version, descripcion, migrar in MIGRACIONES:
+        if version <= actual:
+            continue
+        print(f"🔧 Migración {version}: {descripcion}")
+        with engine.begin() as conn:
+            migrar(conn)
+            conn.execute(schema_version.insert().values(
+                version=version, descripcion=descripcion, aplicada=datetime.utcnow()
+            ))
+        actual = version
+
+    return actual
+
+
+if __name__ == "__main__":
+    from database import engine
+    from models import Base
+
+    Base.metadata.create_all(bind=engine)
+    try:
+        version = aplicar_migraciones(engine)
+        print(f"✅ Esquema en la versión {version}")
+    except Exception as e:
+        print(f"❌ Error aplicando migraciones: {e}")
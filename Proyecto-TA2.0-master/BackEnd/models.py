@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Date, Integer, String, DateTime, Boolean, Text, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Date, Integer, String, DateTime, Boolean, Text, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -18,6 +18,7 @@ class Profesora(Base):
     especialidad = Column(String(100), nullable=False)
     fecha_registro = Column(DateTime, default=datetime.utcnow)
     activa = Column(Boolean, default=True)
+    token_epoch = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relaciones
     asistencias = relationship("Asistencia", back_populates="profesora")
@@ -38,6 +39,7 @@ class Clase(Base):
     
     # Relaciones
     profesora = relationship("Profesora", back_populates="clases")
+    __table_args__ = (Index('ix_clases_profesora_inicio', 'profesora_id', 'fecha_inicio'),)
     
     
 
@@ -51,6 +53,13 @@ class Aprendiz(Base):
 
     profesora = relationship("Profesora", backref="aprendices")
     asistencias = relationship("Asistencia", back_populates="aprendiz", cascade="all, delete-orphan")
+    resumen = relationship("ResumenAsistencia", uselist=False, cascade="all, delete-orphan")
+    riesgo = relationship("RiesgoAprendiz", uselist=False, cascade="all, delete-orphan")
+    __table_args__ = (
+        # Búsquedas del importador por documento y por nombre dentro de la lista de una profesora
+        Index('ix_aprendices_profesora_documento', 'profesora_id', 'documento'),
+        Index('ix_aprendices_profesora_nombre', 'profesora_id', 'nombre'),
+    )
 
 class Asistencia(Base):
     __tablename__ = "asistencias"
@@ -62,4 +71,60 @@ class Asistencia(Base):
 
     aprendiz = relationship("Aprendiz", back_populates="asistencias")
     profesora = relationship("Profesora", back_populates="asistencias")
-    __table_args__ = (UniqueConstraint('aprendiz_id', 'fecha', name='_aprendiz_fecha_uc'),)
\ No newline at end of file
+    __table_args__ = (
+        UniqueConstraint('aprendiz_id', 'fecha', name='_aprendiz_fecha_uc'),
+        # Filtros por profesora y rango de fechas; incluye presente para contar solo con el índice
+        Index('ix_asistencias_profesora_fecha_presente', 'profesora_id', 'fecha', 'presente'),
+        # Resumen por aprendiz (conteos, primera y última fecha) sin leer la tabla
+        Index('ix_asistencias_aprendiz_fecha_presente', 'aprendiz_id', 'fecha', 'presente'),
+    )
+
+class ResumenAsistencia(Base):
+    """Totales de asistencia por aprendiz, mantenidos por las rutas de escritura"""
+    __tablename__ = "resumen_asistencias"
+    aprendiz_id = Column(Integer, ForeignKey("aprendices.id", ondelete="CASCADE"), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    presentes = Column(Integer, nullable=False, default=0)
+    primera_fecha = Column(Date, nullable=True)
+    ultima_fecha = Column(Date, nullable=True)
+
+class ResumenDiario(Base):
+    """Totales de asistencia por profesora (la del aprendiz) y día, mantenidos por las rutas de escritura"""
+    __tablename__ = "resumen_diario"
+    profesora_id = Column(Integer, ForeignKey("profesoras.id", ondelete="CASCADE"), primary_key=True)
+    fecha = Column(Date, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    presentes = Column(Integer, nullable=False, default=0)
+    __table_args__ = (
+        # Vista de admin: todas las profesoras en un rango de fechas
+        Index('ix_resumen_diario_fecha', 'fecha'),
+    )
+
+class RiesgoAprendiz(Base):
+    """Estado incremental para detectar aprendices en riesgo (ver riesgo_aprendices.py)"""
+    __tablename__ = "riesgo_aprendices"
+    aprendiz_id = Column(Integer, ForeignKey("aprendices.id", ondelete="CASCADE"), primary_key=True)
+    # Día más reciente registrado; el bit k de las máscaras es el día ultima_fecha - k
+    ultima_fecha = Column(Date, nullable=True)
+    mascara_registros = Column(Integer, nullable=False, default=0)
+    mascara_presentes = Column(Integer, nullable=False, default=0)
+    racha_ausencias = Column(Integer, nullable=False, default=0)
+    en_riesgo = Column(Boolean, nullable=False, default=False, index=True)
+
+class VersionDatos(Base):
+    """Versión de los datos de cada profesora por recurso, para los ETag (ver versiones_datos.py)"""
+    __tablename__ = "versiones_datos"
+    # Sin FK a profesoras: las filas se conservan para que la suma de los admin nunca baje
+    recurso = Column(String(20), primary_key=True)
+    profesora_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class ImportacionEstado(Base):
+    """Estado de las importaciones en segundo plano, visible desde cualquier worker (ver trabajos_importacion.py)"""
+    __tablename__ = "importaciones"
+    id = Column(String(32), primary_key=True)
+    profesora_id = Column(Integer, ForeignKey("profesoras.id", ondelete="CASCADE"), nullable=False)
+    estado = Column(String(20), nullable=False)
+    # JSON de TrabajoImportacion.a_dict() en el último cambio de estado
+    datos = Column(Text, nullable=False)
+    terminado = Column(DateTime, nullable=True, index=True)
@@ -0,0 +1,49 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+# Configuración desde .env
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_COLA_MAX = int(os.getenv("HASH_COLA_MAX", "32"))
+
+# Único contexto bcrypt de la aplicación
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# bcrypt libera el GIL mientras calcula, así que un pool de hilos reparte bien el trabajo
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+# Operaciones en curso más en espera; por encima de esto se responde 503
+_cupos = threading.BoundedSemaphore(HASH_WORKERS + HASH_COLA_MAX)
+
+
+def verify_password(plain_password, hashed_password):
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def get_password_hash(password):
+    return pwd_context.hash(password)
+
+
+async def _en_pool(funcion, *args):
+    """Ejecutar una operación bcrypt fuera del event loop, con cola acotada"""
+    if not _cupos.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, intenta de nuevo en unos segundos",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        return await asyncio.wrap_future(_executor.submit(funcion, *args))
+    finally:
+        _cupos.release()
+
+
+async def verificar_password(plain_password: str, hashed_password: str) -> bool:
+    return await _en_pool(verify_password, plain_password, hashed_password)
+
+
+async def hashear_password(password: str) -> str:
+    return await _en_pool(get_password_hash, password)
@@ -0,0 +1,60 @@
+"""Serialización JSON rápida para las listas grandes (opcional, JSON_RAPIDO=true).
+
+Con response_model, FastAPI vuelve a validar cada elemento, lo pasa a tipos JSON de
+Python y al final lo codifica con el módulo json. En listas de miles de filas eso es casi
+todo el tiempo de CPU de la petición. En modo rápido:
+
+- la clase de respuesta por defecto de la app es ORJSONResponse;
+- las rutas de listas devuelven un Response con los bytes ya armados, que FastAPI no
+  vuelve a procesar: los dicts armados en el handler con columnas de la base se codifican
+  con orjson y las listas de modelos con un TypeAdapter creado una sola vez.
+
+El response_model se sigue declarando, así la documentación de OpenAPI no cambia. Ver
+benchmark_json.py.
+"""
+import os
+from typing import Any, Optional
+
+from fastapi import Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Configuración desde .env
+JSON_RAPIDO = os.getenv("JSON_RAPIDO", "false").lower() == "true"
+
+# Sin orjson, los dicts se codifican con pydantic-core (más lento, pero sin pasar por json)
+_ADAPTADOR_LIBRE = TypeAdapter(Any)
+
+
+def clase_respuesta_por_defecto():
+    if not JSON_RAPIDO:
+        return JSONResponse
+    if orjson is None:
+        print("⚠️  JSON_RAPIDO=true pero orjson no está instalado; se usa la respuesta JSON estándar")
+        return JSONResponse
+    return ORJSONResponse
+
+
+def a_bytes(contenido, adaptador: Optional[TypeAdapter] = None) -> bytes:
+    """Codificar sin validar: el contenido ya tiene la forma del response_model"""
+    if adaptador is not None:
+        return adaptador.dump_json(contenido)
+    if orjson is not None:
+        return orjson.dumps(contenido)
+    return _ADAPTADOR_LIBRE.dump_json(contenido)
+
+
+def respuesta_json(contenido, adaptador: Optional[TypeAdapter] = None):
+    """En modo rápido, un Response con el JSON ya codificado; si no, el contenido tal cual.
+
+    `adaptador` es para listas de modelos Pydantic (TypeAdapter(List[Modelo]) a nivel de
+    módulo); los dicts y listas de dicts no lo necesitan.
+    """
+    if not JSON_RAPIDO:
+        return contenido
+    return Response(content=a_bytes(contenido, adaptador), media_type="application/json")
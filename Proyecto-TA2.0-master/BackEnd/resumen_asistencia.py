@@ -0,0 +1,81 @@
+from typing import Iterable
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from models import Aprendiz, Asistencia, ResumenAsistencia
+from escritura_masiva import insertar_o_actualizar
+
+# Aprendices que se recalculan por sentencia al reconstruir
+APRENDICES_POR_LOTE = 500
+
+
+def actualizar_resumen(db: Session, aprendiz_ids: Iterable[int]):
+    """Recalcular el resumen de los aprendices indicados dentro de la transacción actual.
+
+    Se llama desde cada ruta que escribe asistencias, antes del commit. Solo lee las filas
+    de esos aprendices (por la clave única aprendiz_id, fecha) y hace un único upsert.
+    """
+    ids = sorted(set(aprendiz_ids))
+    if not ids:
+        return
+
+    # La sesión no hace autoflush: los cambios ORM pendientes deben verse en el SELECT
+    db.flush()
+
+    agregados = {
+        fila.aprendiz_id: fila
+        for fila in db.execute(
+            select(
+                Asistencia.aprendiz_id,
+                func.count(Asistencia.id).label("total"),
+                func.sum(case((Asistencia.presente == True, 1), else_=0)).label("presentes"),
+                func.min(Asistencia.fecha).label("primera_fecha"),
+                func.max(Asistencia.fecha).label("ultima_fecha"),
+            )
+            .where(Asistencia.aprendiz_id.in_(ids))
+            .group_by(Asistencia.aprendiz_id)
+        )
+    }
+
+    filas = []
+    for aprendiz_id in ids:
+        fila = agregados.get(aprendiz_id)
+        filas.append({
+            "aprendiz_id": aprendiz_id,
+            "total": fila.total if fila else 0,
+            "presentes": int(fila.presentes or 0) if fila else 0,
+            "primera_fecha": fila.primera_fecha if fila else None,
+            "ultima_fecha": fila.ultima_fecha if fila else None
+        })
+
+    insertar_o_actualizar(
+        db,
+        ResumenAsistencia.__table__,
+        filas,
+        columnas_actualizar=["total", "presentes", "primera_fecha", "ultima_fecha"],
+        columnas_clave=["aprendiz_id"]
+    )
+
+
+def reconstruir_resumen(db: Session) -> int:
+    """Recalcular el resumen de todos los aprendices (reparación). Devuelve cuántos procesó."""
+    ids = list(db.execute(select(Aprendiz.id).order_by(Aprendiz.id)).scalars())
+    for i in range(0, len(ids), APRENDICES_POR_LOTE):
+        actualizar_resumen(db, ids[i:i + APRENDICES_POR_LOTE])
+        db.commit()
+    return len(ids)
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        total = reconstruir_resumen(db)
+        print(f"✅ Resumen de asistencia reconstruido para {total} aprendices")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error reconstruyendo resumen: {e}")
+    finally:
+        db.close()
@@ -0,0 +1,117 @@
+from collections import defaultdict
+from datetime import date
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.orm import Session
+
+from models import Aprendiz, Asistencia, ResumenDiario
+from escritura_masiva import insertar_o_actualizar
+
+# Días que se recalculan por sentencia al reconstruir
+DIAS_POR_LOTE = 500
+
+
+def actualizar_diario(db: Session, claves: Iterable[Tuple[Optional[int], date]]):
+    """Recalcular los días (profesora_id, fecha) indicados dentro de la transacción actual.
+
+    Como actualizar_resumen, se llama desde cada ruta que escribe asistencias, antes del
+    commit. La clave es aprendices.profesora_id (la profesora del aprendiz, no quien registró
+    la asistencia), el mismo alcance que el desglose por aprendiz del reporte. Si un admin
+    registra la asistencia de un aprendiz, el día que cambia es el de su profesora. Los días
+    que se quedan sin registros se borran.
+    """
+    fechas_por_profesora = defaultdict(set)
+    for profesora_id, fecha in claves:
+        if profesora_id is not None:
+            fechas_por_profesora[profesora_id].add(fecha)
+    if not fechas_por_profesora:
+        return
+
+    # La sesión no hace autoflush: los cambios ORM pendientes deben verse en el SELECT
+    db.flush()
+
+    for profesora_id, fechas in fechas_por_profesora.items():
+        fechas = sorted(fechas)
+        agregados = db.execute(
+            select(
+                Asistencia.fecha,
+                func.count(Asistencia.id).label("total"),
+                func.sum(case((Asistencia.presente == True, 1), else_=0)).label("presentes"),
+            )
+            .join(Aprendiz, Aprendiz.id == Asistencia.aprendiz_id)
+            .where(Aprendiz.profesora_id == profesora_id, Asistencia.fecha.in_(fechas))
+            .group_by(Asistencia.fecha)
+        ).all()
+
+        insertar_o_actualizar(
+            db,
+            ResumenDiario.__table__,
+            [
+                {
+                    "profesora_id": profesora_id,
+                    "fecha": fila.fecha,
+                    "total": fila.total,
+                    "presentes": int(fila.presentes or 0)
+                }
+                for fila in agregados
+            ],
+            columnas_actualizar=["total", "presentes"],
+            columnas_clave=["profesora_id", "fecha"]
+        )
+
+        vacias = set(fechas) - {fila.fecha for fila in agregados}
+        if vacias:
+            db.execute(delete(ResumenDiario).where(
+                ResumenDiario.profesora_id == profesora_id,
+                ResumenDiario.fecha.in_(vacias)
+            ))
+
+
+def consulta_totales(fecha_inicio: date, fecha_fin: Optional[date] = None,
+                     profesora_id: Optional[int] = None):
+    """SELECT de (total, presentes, días con registro) del período; sin profesora_id suma todas.
+
+    Devuelve la sentencia para poder ejecutarla con la sesión sync o con la async.
+    """
+    query = select(
+        func.coalesce(func.sum(ResumenDiario.total), 0).label("total"),
+        func.coalesce(func.sum(ResumenDiario.presentes), 0).label("presentes"),
+        func.count(ResumenDiario.fecha).label("dias"),
+    ).where(ResumenDiario.fecha >= fecha_inicio)
+    if fecha_fin is not None:
+        query = query.where(ResumenDiario.fecha <= fecha_fin)
+    if profesora_id is not None:
+        query = query.where(ResumenDiario.profesora_id == profesora_id)
+    return query
+
+
+def reconstruir_diario(db: Session) -> int:
+    """Recalcular todo el resumen diario (backfill o reparación). Devuelve cuántos días procesó."""
+    claves = db.execute(
+        select(Aprendiz.profesora_id, Asistencia.fecha)
+        .join(Aprendiz, Aprendiz.id == Asistencia.aprendiz_id)
+        .distinct()
+        .order_by(Aprendiz.profesora_id, Asistencia.fecha)
+    ).all()
+    # Días que ya no tienen asistencias
+    db.execute(delete(ResumenDiario))
+    for i in range(0, len(claves), DIAS_POR_LOTE):
+        actualizar_diario(db, claves[i:i + DIAS_POR_LOTE])
+        db.commit()
+    db.commit()
+    return len(claves)
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        total = reconstruir_diario(db)
+        print(f"✅ Resumen diario reconstruido: {total} días")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error reconstruyendo resumen diario: {e}")
+    finally:
+        db.close()
@@ -0,0 +1,210 @@
+"""Detección incremental de aprendices en riesgo de deserción.
+
+Por aprendiz se guarda (tabla riesgo_aprendices) la racha actual de ausencias y dos
+máscaras de bits con los últimos VENTANA_DIAS días: días con registro y días presentes,
+ancladas en el día más reciente registrado. Con eso cada escritura se aplica en O(1):
+
+- un día nuevo, posterior al ancla, desplaza las máscaras y suma o reinicia la racha;
+- un cambio o borrado dentro de la ventana cambia un bit y la racha se recalcula
+  recorriendo la ventana (VENTANA_DIAS pasos).
+
+Solo si la racha se extiende más allá de la ventana, se borra el día más reciente o el
+aprendiz aún no tiene estado, se recalcula desde su historial.
+
+Uso (reconstruir todo): python riesgo_aprendices.py
+"""
+import os
+from collections import defaultdict
+from datetime import date
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Aprendiz, Asistencia, RiesgoAprendiz
+from escritura_masiva import insertar_o_actualizar
+
+# Configuración desde .env
+RIESGO_RACHA_AUSENCIAS = int(os.getenv("RIESGO_RACHA_AUSENCIAS", "3"))
+RIESGO_TASA_MINIMA = float(os.getenv("RIESGO_TASA_MINIMA", "70"))  # % de asistencia en la ventana
+RIESGO_MIN_REGISTROS = int(os.getenv("RIESGO_MIN_REGISTROS", "5"))  # para evaluar la tasa
+
+VENTANA_DIAS = 30
+_MASCARA = (1 << VENTANA_DIAS) - 1
+
+# Aprendices que se recalculan por sentencia al reconstruir
+APRENDICES_POR_LOTE = 500
+
+COLUMNAS = ["ultima_fecha", "mascara_registros", "mascara_presentes", "racha_ausencias", "en_riesgo"]
+
+
+def tasa_ventana(estado) -> Optional[float]:
+    """Porcentaje de asistencia en la ventana, o None si no hay registros"""
+    registros = bin(estado["mascara_registros"]).count("1")
+    if not registros:
+        return None
+    return round(bin(estado["mascara_presentes"]).count("1") / registros * 100, 2)
+
+
+def _en_riesgo(estado) -> bool:
+    if estado["racha_ausencias"] >= RIESGO_RACHA_AUSENCIAS:
+        return True
+    registros = bin(estado["mascara_registros"]).count("1")
+    return registros >= RIESGO_MIN_REGISTROS and tasa_ventana(estado) < RIESGO_TASA_MINIMA
+
+
+def _racha_en_ventana(registros: int, presentes: int) -> Optional[int]:
+    """Ausencias seguidas desde el día más reciente; None si no hay un presente en la ventana"""
+    racha = 0
+    for k in range(VENTANA_DIAS):
+        if registros >> k & 1:
+            if presentes >> k & 1:
+                return racha
+            racha += 1
+    return None
+
+
+def _aplicar(estado: dict, fecha: date, presente: Optional[bool]) -> bool:
+    """Aplicar un registro (presente=None es un borrado). False si hay que recalcular."""
+    if estado["ultima_fecha"] is None:
+        return False
+
+    atraso = (estado["ultima_fecha"] - fecha).days
+    if atraso < 0 or (atraso == 0 and presente is None):
+        # Borrar el día más reciente mueve el ancla a un día que puede estar fuera de la ventana
+        if presente is None:
+            return False
+        # Día nuevo: se desplaza la ventana
+        bit = 1 if presente else 0
+        estado["mascara_registros"] = (estado["mascara_registros"] << -atraso) & _MASCARA | 1
+        estado["mascara_presentes"] = (estado["mascara_presentes"] << -atraso) & _MASCARA | bit
+        estado["racha_ausencias"] = 0 if presente else estado["racha_ausencias"] + 1
+        estado["ultima_fecha"] = fecha
+        return True
+
+    if atraso < VENTANA_DIAS:
+        bit = 1 << atraso
+        if presente is None:
+            estado["mascara_registros"] &= ~bit
+            estado["mascara_presentes"] &= ~bit
+        else:
+            estado["mascara_registros"] |= bit
+            if presente:
+                estado["mascara_presentes"] |= bit
+            else:
+                estado["mascara_presentes"] &= ~bit
+
+    # Cambio en un día pasado: la racha solo puede cambiar si llega hasta ese día
+    racha = _racha_en_ventana(estado["mascara_registros"], estado["mascara_presentes"])
+    if racha is None:
+        return False
+    estado["racha_ausencias"] = racha
+    return True
+
+
+def _estado_vacio(aprendiz_id: int) -> dict:
+    return {
+        "aprendiz_id": aprendiz_id,
+        "ultima_fecha": None,
+        "mascara_registros": 0,
+        "mascara_presentes": 0,
+        "racha_ausencias": 0,
+        "en_riesgo": False
+    }
+
+
+def _recalcular(db: Session, aprendiz_ids: list) -> dict:
+    """Estado de los aprendices calculado desde su historial completo"""
+    estados = {aprendiz_id: _estado_vacio(aprendiz_id) for aprendiz_id in aprendiz_ids}
+    racha_abierta = set(aprendiz_ids)
+
+    for aprendiz_id, fecha, presente in db.execute(
+        select(Asistencia.aprendiz_id, Asistencia.fecha, Asistencia.presente)
+        .where(Asistencia.aprendiz_id.in_(aprendiz_ids))
+        .order_by(Asistencia.aprendiz_id, Asistencia.fecha.desc())
+    ):
+        estado = estados[aprendiz_id]
+        if estado["ultima_fecha"] is None:
+            estado["ultima_fecha"] = fecha
+        atraso = (estado["ultima_fecha"] - fecha).days
+        if atraso < VENTANA_DIAS:
+            estado["mascara_registros"] |= 1 << atraso
+            if presente:
+                estado["mascara_presentes"] |= 1 << atraso
+        if aprendiz_id in racha_abierta:
+            if presente:
+                racha_abierta.discard(aprendiz_id)
+            else:
+                estado["racha_ausencias"] += 1
+
+    return estados
+
+
+def registrar_asistencias(db: Session, cambios: Iterable[Tuple[int, date, Optional[bool]]]):
+    """Actualizar el estado de riesgo con los registros escritos (presente=None: borrado).
+
+    Se llama desde cada ruta que escribe asistencias, antes del commit, como actualizar_resumen.
+    Lee el estado de los aprendices afectados con una consulta y lo guarda con un upsert.
+    """
+    por_aprendiz = defaultdict(list)
+    for aprendiz_id, fecha, presente in cambios:
+        por_aprendiz[aprendiz_id].append((fecha, presente))
+    if not por_aprendiz:
+        return
+
+    ids = sorted(por_aprendiz)
+    tabla = RiesgoAprendiz.__table__
+    estados = {
+        fila["aprendiz_id"]: dict(fila)
+        for fila in db.execute(select(tabla).where(tabla.c.aprendiz_id.in_(ids))).mappings()
+    }
+
+    pendientes = []
+    for aprendiz_id in ids:
+        estado = estados.get(aprendiz_id)
+        # En orden de fecha, para que un lote de días nuevos se aplique como desplazamientos
+        if estado is None or not all(_aplicar(estado, f, p) for f, p in sorted(por_aprendiz[aprendiz_id], key=lambda c: c[0])):
+            pendientes.append(aprendiz_id)
+
+    if pendientes:
+        # La sesión no hace autoflush: los cambios ORM pendientes deben verse en el SELECT
+        db.flush()
+        estados.update(_recalcular(db, pendientes))
+
+    _guardar(db, [estados[aprendiz_id] for aprendiz_id in ids])
+
+
+def _guardar(db: Session, estados: list):
+    for estado in estados:
+        estado["en_riesgo"] = _en_riesgo(estado)
+    insertar_o_actualizar(
+        db,
+        RiesgoAprendiz.__table__,
+        estados,
+        columnas_actualizar=COLUMNAS,
+        columnas_clave=["aprendiz_id"]
+    )
+
+
+def reconstruir_riesgo(db: Session) -> int:
+    """Recalcular el estado de todos los aprendices (reparación). Devuelve cuántos procesó."""
+    ids = list(db.execute(select(Aprendiz.id).order_by(Aprendiz.id)).scalars())
+    for i in range(0, len(ids), APRENDICES_POR_LOTE):
+        lote = ids[i:i + APRENDICES_POR_LOTE]
+        _guardar(db, list(_recalcular(db, lote).values()))
+        db.commit()
+    return len(ids)
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        total = reconstruir_riesgo(db)
+        print(f"✅ Estado de riesgo reconstruido para {total} aprendices")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error reconstruyendo estado de riesgo: {e}")
+    finally:
+        db.close()
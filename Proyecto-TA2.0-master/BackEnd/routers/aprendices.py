@@ -1,12 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel
 
-from database import get_db
-from models import Aprendiz, Profesora
+from database import get_async_db
+from models import Aprendiz, Asistencia, Profesora
 from auth import get_current_user
+from cache_dashboard import cache_dashboard
+from resumen_diario import actualizar_diario
+from respuestas_json import respuesta_json
+from versiones_datos import (
+    RECURSO_APRENDICES, RECURSO_ASISTENCIAS, coincide, con_etag, consulta_version, etag_lista, incrementar_version, no_modificado
+)
 
 router = APIRouter(prefix="/aprendices", tags=["aprendices"])
 
@@ -56,19 +64,28 @@ def serialize_aprendiz(aprendiz: Aprendiz) -> dict:
         'profesora': profesora_obj
     }
 
+async def _obtener_aprendiz(db: AsyncSession, aprendiz_id: int) -> Optional[Aprendiz]:
+    """Aprendiz con su profesora ya cargada (en async no hay carga perezosa de relaciones)"""
+    return await db.scalar(
+        select(Aprendiz)
+        .options(selectinload(Aprendiz.profesora))
+        .where(Aprendiz.id == aprendiz_id)
+        .execution_options(populate_existing=True)
+    )
+
 # CRUD Endpoints para Aprendices
 @router.post("", response_model=AprendizResponse)
 async def crear_aprendiz(
     aprendiz_data: AprendizCreate,
     current_user: Profesora = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Si no se especifica profesora_id, usar el usuario actual
     profesora_id = aprendiz_data.profesora_id or current_user.id
     
     # Verificar que la profesora existe (si no es el usuario actual)
     if profesora_id != current_user.id:
-        profesora = db.query(Profesora).filter(Profesora.id == profesora_id).first()
+        profesora = await db.get(Profesora, profesora_id)
         if not profesora:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -82,35 +99,42 @@ async def crear_aprendiz(
     )
     
     db.add(aprendiz)
-    db.commit()
-    db.refresh(aprendiz)
+    await db.run_sync(incrementar_version, RECURSO_APRENDICES, [profesora_id])
+    await db.commit()
+    cache_dashboard.invalidar(current_user.id, current_user.is_admin)
 
-    return serialize_aprendiz(aprendiz)
+    return serialize_aprendiz(await _obtener_aprendiz(db, aprendiz.id))
 
 @router.get("", response_model=List[AprendizResponse])
 async def get_aprendices(
+    response: Response,
     profesora_id: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
     current_user: Profesora = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(Aprendiz)
+    etag = etag_lista(RECURSO_APRENDICES, current_user, await db.scalar(consulta_version(RECURSO_APRENDICES, current_user)))
+    if coincide(if_none_match, etag):
+        return no_modificado(etag)
+
+    query = select(Aprendiz).options(selectinload(Aprendiz.profesora))
     
     # Si no es admin, solo mostrar sus propios aprendices
     if not current_user.is_admin:
-        query = query.filter(Aprendiz.profesora_id == current_user.id)
+        query = query.where(Aprendiz.profesora_id == current_user.id)
     elif profesora_id:
-        query = query.filter(Aprendiz.profesora_id == profesora_id)
+        query = query.where(Aprendiz.profesora_id == profesora_id)
     
-    aprendices = query.all()
-    return [serialize_aprendiz(a) for a in aprendices]
+    aprendices = (await db.scalars(query)).all()
+    return con_etag(respuesta_json([serialize_aprendiz(a) for a in aprendices]), response, etag)
 
 @router.get("/{aprendiz_id}", response_model=AprendizResponse)
 async def get_aprendiz(
     aprendiz_id: int,
     current_user: Profesora = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    aprendiz = db.query(Aprendiz).filter(Aprendiz.id == aprendiz_id).first()
+    aprendiz = await _obtener_aprendiz(db, aprendiz_id)
     
     if not aprendiz:
         raise HTTPException(
@@ -132,9 +156,9 @@ async def actualizar_aprendiz(
     aprendiz_id: int,
     aprendiz_data: AprendizUpdate,
     current_user: Profesora = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    aprendiz = db.query(Aprendiz).filter(Aprendiz.id == aprendiz_id).first()
+    aprendiz = await _obtener_aprendiz(db, aprendiz_id)
     
     if not aprendiz:
         raise HTTPException(
@@ -150,22 +174,36 @@ async def actualizar_aprendiz(
         )
     
     # Actualizar campos
+    profesoras_afectadas = {aprendiz.profesora_id}
     update_data = aprendiz_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(aprendiz, field, value)
-    
-    db.commit()
-    db.refresh(aprendiz)
+    profesoras_afectadas.add(aprendiz.profesora_id)
+    
+    # Si cambió de profesora, sus días del resumen diario pasan de una a otra
+    if len(profesoras_afectadas) > 1:
+        fechas = (await db.scalars(
+            select(Asistencia.fecha).where(Asistencia.aprendiz_id == aprendiz_id).distinct()
+        )).all()
+        await db.run_sync(actualizar_diario, [(profesora_id, fecha) for profesora_id in profesoras_afectadas for fecha in fechas])
 
-    return serialize_aprendiz(aprendiz)
+    # El nombre y el documento también salen en la lista de asistencias
+    await db.run_sync(incrementar_version, RECURSO_APRENDICES, profesoras_afectadas)
+    await db.run_sync(incrementar_version, RECURSO_ASISTENCIAS, profesoras_afectadas)
+    await db.commit()
+    cache_dashboard.invalidar(current_user.id, current_user.is_admin)
+    for profesora_id in profesoras_afectadas - {current_user.id}:
+        cache_dashboard.invalidar(profesora_id)
+
+    return serialize_aprendiz(await _obtener_aprendiz(db, aprendiz.id))
 
 @router.delete("/{aprendiz_id}")
 async def eliminar_aprendiz(
     aprendiz_id: int,
     current_user: Profesora = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    aprendiz = db.query(Aprendiz).filter(Aprendiz.id == aprendiz_id).first()
+    aprendiz = await _obtener_aprendiz(db, aprendiz_id)
     
     if not aprendiz:
         raise HTTPException(
@@ -180,7 +218,15 @@ async def eliminar_aprendiz(
             detail="No tienes permisos para eliminar este aprendiz"
         )
     
-    db.delete(aprendiz)
-    db.commit()
+    # Sus asistencias se borran en cascada: recalcular los días que ocupaban
+    registros = (await db.execute(
+        select(Asistencia.profesora_id, Asistencia.fecha).where(Asistencia.aprendiz_id == aprendiz_id).distinct()
+    )).all()
+    await db.delete(aprendiz)
+    await db.run_sync(actualizar_diario, [(aprendiz.profesora_id, fecha) for _, fecha in registros])
+    await db.run_sync(incrementar_version, RECURSO_APRENDICES, [aprendiz.profesora_id])
+    await db.run_sync(incrementar_version, RECURSO_ASISTENCIAS, [profesora_id for profesora_id, _ in registros])
+    await db.commit()
+    cache_dashboard.invalidar(current_user.id, current_user.is_admin)
     
     return {"message": "Aprendiz eliminado exitosamente"}
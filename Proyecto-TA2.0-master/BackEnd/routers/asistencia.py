@@ -1,14 +1,26 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Header, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, case, or_, select
 from database import get_db
-from models import Aprendiz, Asistencia, Profesora
+from models import Aprendiz, Asistencia, Profesora, ResumenAsistencia, RiesgoAprendiz
 from auth import get_current_user
+from escritura_masiva import upsert_asistencias
+from resumen_asistencia import actualizar_resumen
+from resumen_diario import actualizar_diario, consulta_totales
+from analitica_asistencia import cargar_datos, calcular_metricas
+from riesgo_aprendices import RIESGO_RACHA_AUSENCIAS, RIESGO_TASA_MINIMA, VENTANA_DIAS, registrar_asistencias, tasa_ventana
+from cache_dashboard import cache_dashboard
+from respuestas_json import respuesta_json
+from versiones_datos import RECURSO_APRENDICES, RECURSO_ASISTENCIAS, coincide, con_etag, consulta_version, etag_lista, incrementar_version, no_modificado
+from exportacion import (
+    FILAS_POR_LECTURA, MEDIA_TYPE_XLSX, csv_en_fragmentos, fechas_exportables, filas_matriz, tiene_aprendices, xlsx_en_fragmentos
+)
+from trabajos_importacion import ColaImportacionLlena, encolar_importacion, obtener_trabajo
 from datetime import datetime, date
-import pandas as pd
+import base64
+import json
 from fastapi.responses import StreamingResponse
-import io
-from typing import List, Optional
+from typing import List, Optional, Union
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/asistencia", tags=["Asistencia"])
@@ -37,81 +49,148 @@ class AsistenciaMasivaCreate(BaseModel):
     fecha: date
     asistencias: List[dict]  # [{"aprendiz_id": 1, "presente": True}, ...]
 
+class AsistenciaMasivaItem(BaseModel):
+    aprendiz_id: int
+    presente: bool = True
+
+class AsistenciaMasivaCreateV2(BaseModel):
+    fecha: date
+    asistencias: List[AsistenciaMasivaItem]
+
 class ToggleAttendance(BaseModel):
     aprendiz_id: int
     fecha: str
     presente: bool
 
-def _parse_date_col(col):
-    """Helper function para parsear fechas de diferentes formatos"""
-    for fmt in ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y"):
-        try:
-            return datetime.strptime(str(col), fmt).date()
-        except Exception:
-            continue
-    return None
+class AsistenciaPagina(BaseModel):
+    items: List[AsistenciaResponse]
+    next_cursor: Optional[str] = None
+
+def _codificar_cursor(fecha: date, asistencia_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{fecha.isoformat()}|{asistencia_id}".encode()).decode()
+
+def _decodificar_cursor(cursor: str):
+    try:
+        fecha_txt, id_txt = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return date.fromisoformat(fecha_txt), int(id_txt)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def _fila_a_dict(fila) -> dict:
+    return {
+        "id": fila.id,
+        "aprendiz_id": fila.aprendiz_id,
+        "fecha": fila.fecha,
+        "presente": fila.presente,
+        "profesora_id": fila.profesora_id,
+        "aprendiz": {
+            "id": fila.aprendiz_id,
+            "nombre": fila.nombre,
+            "documento": fila.documento
+        }
+    }
+
+def _ndjson(resultado):
+    for fila in resultado:
+        item = _fila_a_dict(fila)
+        item["fecha"] = item["fecha"].isoformat()
+        yield json.dumps(item, ensure_ascii=False) + "\n"
 
 # CRUD Endpoints mejorados
-@router.get("/", response_model=List[AsistenciaResponse])
+@router.get("/", response_model=Union[List[AsistenciaResponse], AsistenciaPagina])
 def obtener_asistencias(
+    response: Response,
     profesora_id: Optional[int] = Query(None),
     fecha_inicio: Optional[str] = Query(None),
     fecha_fin: Optional[str] = Query(None),
     aprendiz_id: Optional[int] = Query(None),
     presente: Optional[bool] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     user=Depends(get_current_user)
 ):
-    """Obtener asistencias con filtros opcionales - versión mejorada"""
-    query = db.query(Asistencia).join(Aprendiz)
+    """Obtener asistencias con filtros opcionales.
+
+    Con `limit` responde por páginas ordenadas por (fecha DESC, id DESC) y devuelve
+    `next_cursor` para pedir la siguiente. Con `Accept: application/x-ndjson` las filas
+    se envían una por línea a medida que salen del cursor del servidor.
+
+    Responde 304 si If-None-Match coincide con la versión actual de los datos.
+    """
+    ndjson = bool(accept and "application/x-ndjson" in accept)
+    version = db.execute(consulta_version(RECURSO_ASISTENCIAS, user)).scalar_one()
+    etag = etag_lista(RECURSO_ASISTENCIAS, user, version, *(["ndjson"] if ndjson else []))
+    if coincide(if_none_match, etag):
+        return no_modificado(etag)
+
+    query = select(
+        Asistencia.id,
+        Asistencia.aprendiz_id,
+        Asistencia.fecha,
+        Asistencia.presente,
+        Asistencia.profesora_id,
+        Aprendiz.nombre,
+        Aprendiz.documento
+    ).join(Aprendiz, Aprendiz.id == Asistencia.aprendiz_id)
     
     # Control de permisos
     if not getattr(user, 'is_admin', False):
-        query = query.filter(Asistencia.profesora_id == user.id)
+        query = query.where(Asistencia.profesora_id == user.id)
     elif profesora_id:
-        query = query.filter(Asistencia.profesora_id == profesora_id)
+        query = query.where(Asistencia.profesora_id == profesora_id)
     
     # Filtros de fecha
     if fecha_inicio:
         try:
             fecha_ini = datetime.strptime(fecha_inicio, "%Y-%m-%d").date()
-            query = query.filter(Asistencia.fecha >= fecha_ini)
+            query = query.where(Asistencia.fecha >= fecha_ini)
         except ValueError:
             pass
     
     if fecha_fin:
         try:
             fecha_fin_date = datetime.strptime(fecha_fin, "%Y-%m-%d").date()
-            query = query.filter(Asistencia.fecha <= fecha_fin_date)
+            query = query.where(Asistencia.fecha <= fecha_fin_date)
         except ValueError:
             pass
     
     # Filtros adicionales
     if aprendiz_id:
-        query = query.filter(Asistencia.aprendiz_id == aprendiz_id)
+        query = query.where(Asistencia.aprendiz_id == aprendiz_id)
     
     if presente is not None:
-        query = query.filter(Asistencia.presente == presente)
-    
-    asistencias = query.order_by(Asistencia.fecha.desc()).all()
-    
-    # Formatear respuesta
-    result = []
-    for asist in asistencias:
-        result.append({
-            "id": asist.id,
-            "aprendiz_id": asist.aprendiz_id,
-            "fecha": asist.fecha,
-            "presente": asist.presente,
-            "profesora_id": asist.profesora_id,
-            "aprendiz": {
-                "id": asist.aprendiz.id,
-                "nombre": asist.aprendiz.nombre,
-                "documento": asist.aprendiz.documento
-            }
-        })
+        query = query.where(Asistencia.presente == presente)
+
+    # Paginación por clave: continuar después de la última fila entregada
+    if cursor:
+        fecha_cursor, id_cursor = _decodificar_cursor(cursor)
+        query = query.where(or_(
+            Asistencia.fecha < fecha_cursor,
+            and_(Asistencia.fecha == fecha_cursor, Asistencia.id < id_cursor)
+        ))
     
-    return result
+    query = query.order_by(Asistencia.fecha.desc(), Asistencia.id.desc())
+
+    if ndjson:
+        if limit:
+            query = query.limit(limit)
+        resultado = db.execute(query.execution_options(yield_per=FILAS_POR_LECTURA))
+        return con_etag(StreamingResponse(_ndjson(resultado), media_type="application/x-ndjson"), response, etag)
+
+    if limit is None:
+        return con_etag(respuesta_json([_fila_a_dict(fila) for fila in db.execute(query)]), response, etag)
+
+    # Se pide una fila de más para saber si hay otra página
+    filas = db.execute(query.limit(limit + 1)).all()
+    next_cursor = None
+    if len(filas) > limit:
+        filas = filas[:limit]
+        next_cursor = _codificar_cursor(filas[-1].fecha, filas[-1].id)
+
+    return con_etag(respuesta_json({"items": [_fila_a_dict(fila) for fila in filas], "next_cursor": next_cursor}), response, etag)
 
 @router.post("/", response_model=AsistenciaResponse)
 def crear_asistencia(
@@ -145,8 +224,13 @@ def crear_asistencia(
     if existing:
         # Actualizar existente
         existing.presente = asistencia_data.presente
+        actualizar_resumen(db, [existing.aprendiz_id])
+        actualizar_diario(db, [(aprendiz.profesora_id, existing.fecha)])
+        registrar_asistencias(db, [(existing.aprendiz_id, existing.fecha, existing.presente)])
+        incrementar_version(db, RECURSO_ASISTENCIAS, [existing.profesora_id, aprendiz.profesora_id])
         db.commit()
         db.refresh(existing)
+        cache_dashboard.invalidar(user.id, getattr(user, 'is_admin', False))
         return {
             "id": existing.id,
             "aprendiz_id": existing.aprendiz_id,
@@ -154,9 +238,9 @@ def crear_asistencia(
             "presente": existing.presente,
             "profesora_id": existing.profesora_id,
             "aprendiz": {
-                "id": existing.aprendiz.id,
-                "nombre": existing.aprendiz.nombre,
-                "documento": existing.aprendiz.documento
+                "id": aprendiz.id,
+                "nombre": aprendiz.nombre,
+                "documento": aprendiz.documento
             }
         }
     
@@ -169,8 +253,13 @@ def crear_asistencia(
     )
     
     db.add(asistencia)
+    actualizar_resumen(db, [asistencia.aprendiz_id])
+    actualizar_diario(db, [(aprendiz.profesora_id, asistencia.fecha)])
+    registrar_asistencias(db, [(asistencia.aprendiz_id, asistencia.fecha, asistencia.presente)])
+    incrementar_version(db, RECURSO_ASISTENCIAS, [asistencia.profesora_id, aprendiz.profesora_id])
     db.commit()
     db.refresh(asistencia)
+    cache_dashboard.invalidar(user.id, getattr(user, 'is_admin', False))
     
     return {
         "id": asistencia.id,
@@ -179,9 +268,9 @@ def crear_asistencia(
         "presente": asistencia.presente,
         "profesora_id": asistencia.profesora_id,
         "aprendiz": {
-            "id": asistencia.aprendiz.id,
-            "nombre": asistencia.aprendiz.nombre,
-            "documento": asistencia.aprendiz.documento
+            "id": aprendiz.id,
+            "nombre": aprendiz.nombre,
+            "documento": aprendiz.documento
         }
     }
 
@@ -195,6 +284,10 @@ def crear_asistencia_masiva(
     created_count = 0
     updated_count = 0
     errors = []
+    aprendiz_ids = set()
+    dias = set()
+    registradoras = set()
+    cambios = []
     
     for item in asistencia_data.asistencias:
         try:
@@ -224,6 +317,7 @@ def crear_asistencia_masiva(
                 # Actualizar
                 existing.presente = presente
                 updated_count += 1
+                registradoras.add(existing.profesora_id)
             else:
                 # Crear nuevo
                 new_asistencia = Asistencia(
@@ -234,11 +328,20 @@ def crear_asistencia_masiva(
                 )
                 db.add(new_asistencia)
                 created_count += 1
+                registradoras.add(user.id)
+            aprendiz_ids.add(aprendiz_id)
+            dias.add((aprendiz.profesora_id, asistencia_data.fecha))
+            cambios.append((aprendiz_id, asistencia_data.fecha, presente))
                 
         except Exception as e:
             errors.append(f"Error con aprendiz {item.get('aprendiz_id', 'N/A')}: {str(e)}")
     
+    actualizar_resumen(db, aprendiz_ids)
+    actualizar_diario(db, dias)
+    registrar_asistencias(db, cambios)
+    incrementar_version(db, RECURSO_ASISTENCIAS, registradoras | {profesora_id for profesora_id, _ in dias})
     db.commit()
+    cache_dashboard.invalidar(user.id, getattr(user, 'is_admin', False))
     
     return {
         "message": "Asistencia masiva procesada",
@@ -247,6 +350,72 @@ def crear_asistencia_masiva(
         "errores": errors
     }
 
+@router.post("/masiva/v2")
+def crear_asistencia_masiva_v2(
+    asistencia_data: AsistenciaMasivaCreateV2,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    """Registrar la asistencia de una clase completa con una consulta y un upsert"""
+    # Si un aprendiz viene repetido, gana el último valor
+    presentes = {item.aprendiz_id: item.presente for item in asistencia_data.asistencias}
+
+    resultados = {
+        "creadas": [],
+        "actualizadas": [],
+        "no_encontrados": [],
+        "sin_permiso": []
+    }
+    if not presentes:
+        return {"fecha": asistencia_data.fecha, **resultados}
+
+    # Aprendices y asistencia ya registrada ese día, en una sola consulta
+    encontrados = db.execute(
+        select(Aprendiz.id, Aprendiz.profesora_id, Asistencia.id, Asistencia.profesora_id)
+        .outerjoin(Asistencia, and_(
+            Asistencia.aprendiz_id == Aprendiz.id,
+            Asistencia.fecha == asistencia_data.fecha
+        ))
+        .where(Aprendiz.id.in_(list(presentes)))
+    ).all()
+    encontrados = {fila[0]: fila[1:] for fila in encontrados}
+
+    es_admin = getattr(user, 'is_admin', False)
+    filas = []
+    # Días del resumen diario (por profesora del aprendiz) y quién registró cada fila: el
+    # upsert conserva la profesora_id de las filas existentes
+    dias = set()
+    registradoras = set()
+    for aprendiz_id, presente in presentes.items():
+        if aprendiz_id not in encontrados:
+            resultados["no_encontrados"].append(aprendiz_id)
+            continue
+
+        profesora_id, asistencia_id, registrada_por = encontrados[aprendiz_id]
+        if not es_admin and profesora_id != user.id:
+            resultados["sin_permiso"].append(aprendiz_id)
+            continue
+
+        resultados["actualizadas" if asistencia_id else "creadas"].append(aprendiz_id)
+        dias.add((profesora_id, asistencia_data.fecha))
+        registradoras.add(registrada_por if asistencia_id else user.id)
+        filas.append({
+            "aprendiz_id": aprendiz_id,
+            "fecha": asistencia_data.fecha,
+            "presente": presente,
+            "profesora_id": user.id
+        })
+
+    upsert_asistencias(db, filas)
+    actualizar_resumen(db, [fila["aprendiz_id"] for fila in filas])
+    actualizar_diario(db, dias)
+    registrar_asistencias(db, [(fila["aprendiz_id"], fila["fecha"], fila["presente"]) for fila in filas])
+    incrementar_version(db, RECURSO_ASISTENCIAS, registradoras | {profesora_id for profesora_id, _ in dias})
+    db.commit()
+    cache_dashboard.invalidar(user.id, getattr(user, 'is_admin', False))
+
+    return {"fecha": asistencia_data.fecha, **resultados}
+
 @router.patch("/toggle/")
 def toggle_attendance(
     item: ToggleAttendance, 
@@ -282,7 +451,12 @@ def toggle_attendance(
         )
         db.add(a)
     
+    actualizar_resumen(db, [item.aprendiz_id])
+    actualizar_diario(db, [(ap.profesora_id, a.fecha)])
+    registrar_asistencias(db, [(item.aprendiz_id, fecha, item.presente)])
+    incrementar_version(db, RECURSO_ASISTENCIAS, [a.profesora_id, ap.profesora_id])
     db.commit()
+    cache_dashboard.invalidar(user.id, getattr(user, 'is_admin', False))
     return {"ok": True}
 
 @router.get("/reporte")
@@ -290,16 +464,66 @@ def get_reporte_asistencia(
     fecha_inicio: date = Query(...),
     fecha_fin: date = Query(...),
     profesora_id: Optional[int] = Query(None),
+    detalle: str = Query("aprendices", pattern="^(aprendices|totales|completo)$"),
     db: Session = Depends(get_db),
     user=Depends(get_current_user)
 ):
-    """Generar reporte de asistencia por período"""
+    """Generar reporte de asistencia por período.
+
+    Los totales del período salen del resumen diario (un registro por profesora y día, con el
+    mismo alcance que el desglose: la profesora del aprendiz, no quien registró). Con detalle=totales no se calcula el desglose por aprendiz;
+    con detalle=completo se agregan rachas de ausencia, tendencia, tasas semanales y por día
+    de la semana (ver analitica_asistencia.py).
+    """
+    profesora_totales = profesora_id if getattr(user, 'is_admin', False) else user.id
+    totales = db.execute(consulta_totales(fecha_inicio, fecha_fin, profesora_totales)).one()
+    respuesta = {
+        "periodo": {
+            "fecha_inicio": fecha_inicio,
+            "fecha_fin": fecha_fin
+        },
+        "totales": {
+            "total_registros": int(totales.total),
+            "asistencias": int(totales.presentes),
+            "faltas": int(totales.total) - int(totales.presentes),
+            "dias_con_registro": totales.dias,
+            "porcentaje_asistencia": round(totales.presentes / totales.total * 100, 2) if totales.total else 0
+        }
+    }
+    if detalle == "totales":
+        return respuesta
+
+    if detalle == "completo":
+        metricas = calcular_metricas(cargar_datos(db, fecha_inicio, fecha_fin, profesora_totales))
+        nombres = {
+            fila.id: fila
+            for fila in db.execute(
+                select(Aprendiz.id, Aprendiz.nombre, Aprendiz.documento)
+                .where(Aprendiz.id.in_(list(metricas["aprendices"])))
+            )
+        } if metricas["aprendices"] else {}
+        return {
+            **respuesta,
+            "aprendices": [
+                {
+                    "aprendiz_id": aprendiz_id,
+                    "nombre": nombres[aprendiz_id].nombre,
+                    "documento": nombres[aprendiz_id].documento,
+                    **datos
+                }
+                for aprendiz_id, datos in metricas["aprendices"].items()
+            ],
+            "semanas": metricas["semanas"],
+            "dias_semana": metricas["dias_semana"],
+            "tendencia_semanal": metricas["tendencia_semanal"]
+        }
+
     query = db.query(
         Aprendiz.id,
         Aprendiz.nombre,
         Aprendiz.documento,
         func.count(Asistencia.id).label('total_registros'),
-        func.sum(func.cast(Asistencia.presente, db.bind.dialect.INTEGER)).label('presentes'),
+        func.sum(case((Asistencia.presente == True, 1), else_=0)).label('presentes'),
     ).join(Asistencia, Aprendiz.id == Asistencia.aprendiz_id)
     
     # Filtros de permiso
@@ -335,13 +559,59 @@ def get_reporte_asistencia(
         })
     
     return {
-        "periodo": {
-            "fecha_inicio": fecha_inicio,
-            "fecha_fin": fecha_fin
-        },
+        **respuesta,
         "aprendices": reporte
     }
 
+@router.get("/alertas")
+def obtener_alertas(
+    profesora_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    """Aprendices en riesgo de deserción (ver riesgo_aprendices.py).
+
+    El estado se mantiene en cada escritura de asistencias, así que esto es una lectura
+    de la tabla riesgo_aprendices filtrada por en_riesgo.
+    """
+    query = (
+        select(
+            Aprendiz.id, Aprendiz.nombre, Aprendiz.documento, Aprendiz.profesora_id,
+            RiesgoAprendiz.ultima_fecha, RiesgoAprendiz.racha_ausencias,
+            RiesgoAprendiz.mascara_registros, RiesgoAprendiz.mascara_presentes
+        )
+        .join(RiesgoAprendiz, RiesgoAprendiz.aprendiz_id == Aprendiz.id)
+        .where(RiesgoAprendiz.en_riesgo == True)
+        .order_by(RiesgoAprendiz.racha_ausencias.desc(), Aprendiz.nombre)
+    )
+    if not getattr(user, 'is_admin', False):
+        query = query.where(Aprendiz.profesora_id == user.id)
+    elif profesora_id is not None:
+        query = query.where(Aprendiz.profesora_id == profesora_id)
+
+    alertas = []
+    for fila in db.execute(query).mappings():
+        alertas.append({
+            "aprendiz_id": fila["id"],
+            "nombre": fila["nombre"],
+            "documento": fila["documento"],
+            "profesora_id": fila["profesora_id"],
+            "ultima_fecha": fila["ultima_fecha"],
+            "racha_ausencias": fila["racha_ausencias"],
+            "registros_ventana": bin(fila["mascara_registros"]).count("1"),
+            "porcentaje_ventana": tasa_ventana(fila)
+        })
+
+    return {
+        "criterios": {
+            "racha_ausencias": RIESGO_RACHA_AUSENCIAS,
+            "porcentaje_minimo": RIESGO_TASA_MINIMA,
+            "ventana_dias": VENTANA_DIAS
+        },
+        "total": len(alertas),
+        "alertas": alertas
+    }
+
 @router.put("/{asistencia_id}", response_model=AsistenciaResponse)
 def actualizar_asistencia(
     asistencia_id: int,
@@ -370,10 +640,28 @@ def actualizar_asistencia(
     for field, value in update_data.items():
         setattr(asistencia, field, value)
     
+    aprendiz = asistencia.aprendiz
+    actualizar_resumen(db, [asistencia.aprendiz_id])
+    actualizar_diario(db, [(aprendiz.profesora_id, asistencia.fecha)])
+    registrar_asistencias(db, [(asistencia.aprendiz_id, asistencia.fecha, asistencia.presente)])
+    incrementar_version(db, RECURSO_ASISTENCIAS, [asistencia.profesora_id, aprendiz.profesora_id])
     db.commit()
     db.refresh(asistencia)
+    cache_dashboard.invalidar(user.id, getattr(user, 'is_admin', False))
     
-    return AsistenciaResponse.model_validate(asistencia)
+    # El response_model espera el aprendiz como dict, no el objeto de la relación
+    return {
+        "id": asistencia.id,
+        "aprendiz_id": asistencia.aprendiz_id,
+        "fecha": asistencia.fecha,
+        "presente": asistencia.presente,
+        "profesora_id": asistencia.profesora_id,
+        "aprendiz": {
+            "id": aprendiz.id,
+            "nombre": aprendiz.nombre,
+            "documento": aprendiz.documento
+        }
+    }
 
 @router.delete("/{asistencia_id}")
 def eliminar_asistencia(
@@ -397,154 +685,83 @@ def eliminar_asistencia(
             detail="No tienes permisos para eliminar esta asistencia"
         )
     
+    # La profesora del aprendiz se lee antes de que el flush borre la fila
+    duena = asistencia.aprendiz.profesora_id
     db.delete(asistencia)
+    actualizar_resumen(db, [asistencia.aprendiz_id])
+    actualizar_diario(db, [(duena, asistencia.fecha)])
+    registrar_asistencias(db, [(asistencia.aprendiz_id, asistencia.fecha, None)])
+    incrementar_version(db, RECURSO_ASISTENCIAS, [asistencia.profesora_id, duena])
     db.commit()
+    cache_dashboard.invalidar(user.id, getattr(user, 'is_admin', False))
     
     return {"message": "Asistencia eliminada exitosamente"}
 
 # === FUNCIONALIDADES ESPECÍFICAS DE TU SISTEMA EXISTENTE ===
 
-@router.post("/importar/")
-@router.post("/importar")
-async def importar_asistencia(
+@router.post("/importar/", status_code=202)
+@router.post("/importar", status_code=202)
+def importar_asistencia(
     archivo: UploadFile = File(...), 
     nombre_lista: str = "Importada", 
-    db: Session = Depends(get_db), 
     user=Depends(get_current_user)
 ):
-    """Importar asistencia desde Excel - funcionalidad existente mejorada"""
+    """Importar asistencia desde Excel en segundo plano; devuelve el id del trabajo"""
     try:
-        # Leer Excel
-        df = pd.read_excel(archivo.file, engine="openpyxl")
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error leyendo Excel: {e}")
-
-    # Detectar columna de nombre
-    nombre_col = None
-    for cand in ["NOMBRES", "NOMBRE", "Nombres", "Nombre"]:
-        if cand in df.columns:
-            nombre_col = cand
-            break
-    if nombre_col is None:
-        nombre_col = df.columns[0]
-
-    # Detectar columnas fecha
-    fecha_cols = []
-    for col in df.columns:
-        fecha_parsed = _parse_date_col(col)
-        if fecha_parsed:
-            fecha_cols.append((col, fecha_parsed))
-
-    if not fecha_cols:
+        trabajo = encolar_importacion(archivo.file, archivo.filename, user.id)
+    except ColaImportacionLlena:
         raise HTTPException(
-            status_code=400, 
-            detail="No se encontraron columnas de fecha válidas en el archivo"
+            status_code=503,
+            detail="Hay demasiadas importaciones en curso, intenta de nuevo en unos minutos"
         )
 
-    # Crear aprendices y asistencias
-    created_aprendices = 0
-    created_asistencias = 0
-    updated_asistencias = 0
-    errors = []
-
-    for idx, row in df.iterrows():
-        try:
-            nombre = str(row.get(nombre_col, "")).strip()
-            if not nombre or nombre.lower() == 'nan':
-                continue
+    return {"ok": True, "job_id": trabajo.id, "estado": trabajo.estado}
 
-            documento = str(row.get("DOCUMENTO", "")).strip() if "DOCUMENTO" in df.columns else None
-            if documento and documento.lower() == 'nan':
-                documento = None
-
-            # Buscar o crear aprendiz
-            aprendiz = None
-            if documento:
-                aprendiz = db.query(Aprendiz).filter(
-                    Aprendiz.documento == documento,
-                    Aprendiz.profesora_id == user.id
-                ).first()
-            
-            if not aprendiz:
-                # Buscar por nombre si no hay documento
-                aprendiz = db.query(Aprendiz).filter(
-                    Aprendiz.nombre == nombre,
-                    Aprendiz.profesora_id == user.id
-                ).first()
+@router.get("/importar/{job_id}")
+def estado_importacion(job_id: str, user=Depends(get_current_user)):
+    """Consultar progreso y resultado de una importación"""
+    trabajo = obtener_trabajo(job_id)
 
-            if not aprendiz:
-                aprendiz = Aprendiz(
-                    nombre=nombre, 
-                    documento=documento, 
-                    profesora_id=user.id
-                )
-                db.add(aprendiz)
-                db.flush()  # Para obtener el ID
-                created_aprendices += 1
-
-            # Insertar asistencias
-            for colname, fecha in fecha_cols:
-                val = row.get(colname)
-                presente = False
-                
-                if pd.notna(val) and val != '':
-                    s = str(val).strip().lower()
-                    if s in ("x", "1", "true", "si", "sí", "y", "yes"):
-                        presente = True
-                    else:
-                        try:
-                            if float(val) != 0:
-                                presente = True
-                        except (ValueError, TypeError):
-                            if s:  # Si hay algún valor, considerar presente
-                                presente = True
-
-                # Upsert asistencia
-                existing_asist = db.query(Asistencia).filter(
-                    Asistencia.aprendiz_id == aprendiz.id,
-                    Asistencia.fecha == fecha
-                ).first()
-
-                if existing_asist:
-                    existing_asist.presente = presente
-                    updated_asistencias += 1
-                else:
-                    new_asist = Asistencia(
-                        aprendiz_id=aprendiz.id,
-                        fecha=fecha,
-                        presente=presente,
-                        profesora_id=user.id
-                    )
-                    db.add(new_asist)
-                    created_asistencias += 1
+    if not trabajo or (not getattr(user, 'is_admin', False) and trabajo["profesora_id"] != user.id):
+        raise HTTPException(
+            status_code=404,
+            detail="Importación no encontrada"
+        )
 
-        except Exception as e:
-            errors.append(f"Error procesando fila {idx + 2}: {str(e)}")
-
-    try:
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error guardando en base de datos: {e}")
-
-    return {
-        "ok": True,
-        "aprendices_creados": created_aprendices,
-        "asistencias_creadas": created_asistencias,
-        "asistencias_actualizadas": updated_asistencias,
-        "fechas_procesadas": len(fecha_cols),
-        "errores": errors
-    }
+    return trabajo
 
 @router.get("/listas/")
-def obtener_listas(db: Session = Depends(get_db), user=Depends(get_current_user)):
-    """Obtener lista de aprendices con resumen de asistencias"""
-    aprendices = db.query(Aprendiz).filter(Aprendiz.profesora_id == user.id).all()
+def obtener_listas(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    """Obtener lista de aprendices con resumen de asistencias.
+
+    Responde 304 si If-None-Match coincide: el ETag junta la versión de las asistencias y la
+    de los aprendices, porque el resumen también trae nombre y documento.
+    """
+    version_asistencias = db.execute(consulta_version(RECURSO_ASISTENCIAS, user)).scalar_one()
+    version_aprendices = db.execute(consulta_version(RECURSO_APRENDICES, user)).scalar_one()
+    etag = etag_lista(RECURSO_ASISTENCIAS, user, version_asistencias, "listas", f"a{version_aprendices}")
+    if coincide(if_none_match, etag):
+        return no_modificado(etag)
+
+    filas = db.execute(
+        select(
+            Aprendiz.id, Aprendiz.nombre, Aprendiz.documento,
+            ResumenAsistencia.total, ResumenAsistencia.presentes
+        )
+        .outerjoin(ResumenAsistencia, ResumenAsistencia.aprendiz_id == Aprendiz.id)
+        .where(Aprendiz.profesora_id == user.id)
+        .order_by(Aprendiz.id)
+    ).all()
     result = []
     
-    for ap in aprendices:
-        total_asistencias = len(ap.asistencias)
-        total_presentes = sum(1 for a in ap.asistencias if a.presente)
+    for ap in filas:
+        total_asistencias = ap.total or 0
+        total_presentes = ap.presentes or 0
         porcentaje = (total_presentes / total_asistencias * 100) if total_asistencias > 0 else 0
         
         result.append({
@@ -556,7 +773,7 @@ def obtener_listas(db: Session = Depends(get_db), user=Depends(get_current_user)
             "porcentaje_asistencia": round(porcentaje, 2)
         })
     
-    return result
+    return con_etag(result, response, etag)
 
 @router.get("/detalle/{aprendiz_id}")
 def detalle_aprendiz(
@@ -576,8 +793,12 @@ def detalle_aprendiz(
             detail="Aprendiz no encontrado o no autorizado"
         )
     
-    # Ordenar asistencias por fecha
-    asistencias_ordenadas = sorted(ap.asistencias, key=lambda x: x.fecha)
+    # Asistencias ordenadas por fecha, solo las columnas necesarias
+    asistencias_ordenadas = db.execute(
+        select(Asistencia.fecha, Asistencia.presente)
+        .where(Asistencia.aprendiz_id == ap.id)
+        .order_by(Asistencia.fecha)
+    ).all()
     fechas = [a.fecha for a in asistencias_ordenadas]
     asist_map = {a.fecha.isoformat(): a.presente for a in asistencias_ordenadas}
     
@@ -598,58 +819,98 @@ def detalle_aprendiz(
         }
     }
 
+@router.get("/matriz")
+def obtener_matriz(
+    fecha_inicio: date = Query(...),
+    fecha_fin: date = Query(...),
+    profesora_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    """Matriz compacta de asistencia: las fechas una vez y dos bitsets por aprendiz.
+
+    Para cada aprendiz, `registrado` y `presente` son bitsets en base64 donde el bit i
+    (byte i // 8, bit i % 8, menos significativo primero) corresponde a `fechas[i]`.
+    """
+    query = select(
+        Aprendiz.id, Aprendiz.nombre, Aprendiz.documento, Asistencia.fecha, Asistencia.presente
+    ).outerjoin(Asistencia, and_(
+        Asistencia.aprendiz_id == Aprendiz.id,
+        Asistencia.fecha >= fecha_inicio,
+        Asistencia.fecha <= fecha_fin
+    ))
+
+    # Filtros de permiso
+    if not getattr(user, 'is_admin', False):
+        query = query.where(Aprendiz.profesora_id == user.id)
+    elif profesora_id:
+        query = query.where(Aprendiz.profesora_id == profesora_id)
+
+    filas = db.execute(query.order_by(Aprendiz.id, Asistencia.fecha)).all()
+
+    fechas = sorted({fila.fecha for fila in filas if fila.fecha is not None})
+    posiciones = {f: i for i, f in enumerate(fechas)}
+    tamano = (len(fechas) + 7) // 8
+
+    aprendices = []
+    actual_id = None
+    registrado = presente = None
+    for aprendiz_id, nombre, documento, fecha, asistio in filas:
+        if aprendiz_id != actual_id:
+            if actual_id is not None:
+                aprendices[-1]["registrado"] = base64.b64encode(registrado).decode()
+                aprendices[-1]["presente"] = base64.b64encode(presente).decode()
+            actual_id = aprendiz_id
+            registrado = bytearray(tamano)
+            presente = bytearray(tamano)
+            aprendices.append({"id": aprendiz_id, "nombre": nombre, "documento": documento})
+
+        if fecha is not None:
+            i = posiciones[fecha]
+            registrado[i >> 3] |= 1 << (i & 7)
+            if asistio:
+                presente[i >> 3] |= 1 << (i & 7)
+
+    if actual_id is not None:
+        aprendices[-1]["registrado"] = base64.b64encode(registrado).decode()
+        aprendices[-1]["presente"] = base64.b64encode(presente).decode()
+
+    return {
+        "periodo": {
+            "fecha_inicio": fecha_inicio,
+            "fecha_fin": fecha_fin
+        },
+        "fechas": [f.isoformat() for f in fechas],
+        "aprendices": aprendices
+    }
+
 @router.get("/exportar/")
-def exportar_csv(db: Session = Depends(get_db), user=Depends(get_current_user)):
-    """Exportar asistencias a CSV - funcionalidad existente mejorada"""
-    aprendices = db.query(Aprendiz).filter(Aprendiz.profesora_id == user.id).all()
-    
-    if not aprendices:
-        raise HTTPException(status_code=404, detail="No hay aprendices para exportar")
-    
-    # Recopilar todas las fechas únicas
-    fechas_set = set()
-    for ap in aprendices:
-        for a in ap.asistencias:
-            fechas_set.add(a.fecha)
-    
-    fechas = sorted(list(fechas_set))
-    
+@router.get("/exportar")
+def exportar_csv(
+    formato: str = Query("csv", pattern="^(csv|xlsx)$"),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    """Exportar asistencias a CSV o XLSX en streaming, sin armar el archivo en memoria"""
+    fechas = fechas_exportables(db, user.id)
+
     if not fechas:
+        if not tiene_aprendices(db, user.id):
+            raise HTTPException(status_code=404, detail="No hay aprendices para exportar")
         raise HTTPException(status_code=404, detail="No hay asistencias para exportar")
     
-    # Construir filas del CSV
-    rows = []
-    for ap in aprendices:
-        row = {
-            "NOMBRES": ap.nombre,
-            "DOCUMENTO": ap.documento or ""
-        }
-        
-        total_presentes = 0
-        asist_dict = {a.fecha: a.presente for a in ap.asistencias}
-        
-        for f in fechas:
-            presente = asist_dict.get(f, False)
-            row[f.strftime("%d/%m/%Y")] = "X" if presente else ""
-            if presente:
-                total_presentes += 1
-        
-        row["TOTAL"] = total_presentes
-        porcentaje = (total_presentes / len(fechas) * 100) if fechas else 0
-        row["PORCENTAJE"] = f"{porcentaje:.1f}%"
-        
-        rows.append(row)
-    
-    # Crear DataFrame y CSV
-    df = pd.DataFrame(rows)
-    stream = io.StringIO()
-    df.to_csv(stream, index=False)
-    stream.seek(0)
-    
-    filename = f"asistencia_{user.nombre.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.csv"
+    filename = f"asistencia_{user.nombre.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.{formato}"
+    filas = filas_matriz(db, user.id, fechas)
+
+    if formato == "xlsx":
+        contenido = xlsx_en_fragmentos(filas)
+        media_type = MEDIA_TYPE_XLSX
+    else:
+        contenido = csv_en_fragmentos(filas)
+        media_type = "text/csv"
     
     return StreamingResponse(
-        io.StringIO(stream.getvalue()), 
-        media_type="text/csv", 
+        contenido, 
+        media_type=media_type, 
         headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
\ No newline at end of file
+    )
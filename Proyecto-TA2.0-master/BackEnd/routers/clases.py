@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List, Optional
 from datetime import datetime, timedelta
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 import pytz
 
-from database import get_db
+from database import get_async_db
 from models import Clase, Profesora
 from auth import get_current_user
+from cache_dashboard import cache_dashboard
+from respuestas_json import respuesta_json
+from versiones_datos import RECURSO_CLASES, coincide, con_etag, consulta_version, etag_lista, incrementar_version, no_modificado
 
 router = APIRouter(prefix="/clases", tags=["clases"])
 
@@ -53,12 +58,23 @@ class ClaseResponse(BaseModel):
     class Config:
         from_attributes = True
 
+LISTA_CLASES = TypeAdapter(List[ClaseResponse])
+
+async def _obtener_clase(db: AsyncSession, clase_id: int) -> Optional[Clase]:
+    """Clase con su profesora ya cargada (en async no hay carga perezosa de relaciones)"""
+    return await db.scalar(
+        select(Clase)
+        .options(selectinload(Clase.profesora))
+        .where(Clase.id == clase_id)
+        .execution_options(populate_existing=True)
+    )
+
 # Endpoints de clases (CRUD completo)
 @router.post("", response_model=ClaseResponse)
 async def crear_clase(
     clase_data: ClaseCreate,
     current_user: Profesora = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Si no es admin, solo puede crear clases para sí mismo
     if not current_user.is_admin and clase_data.profesora_id != current_user.id:
@@ -68,7 +84,7 @@ async def crear_clase(
         )
     
     # Verificar que la profesora existe
-    profesora = db.query(Profesora).filter(Profesora.id == clase_data.profesora_id).first()
+    profesora = await db.get(Profesora, clase_data.profesora_id)
     if not profesora:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -77,47 +93,54 @@ async def crear_clase(
     
     clase = Clase(**clase_data.model_dump())
     db.add(clase)
-    db.commit()
-    db.refresh(clase)
+    await db.run_sync(incrementar_version, RECURSO_CLASES, [clase.profesora_id])
+    await db.commit()
+    cache_dashboard.invalidar(current_user.id, current_user.is_admin)
     
-    return ClaseResponse.model_validate(clase)
+    return ClaseResponse.model_validate(await _obtener_clase(db, clase.id))
 
 @router.get("", response_model=List[ClaseResponse])
 async def get_clases(
+    response: Response,
     profesora_id: Optional[int] = None,
     fecha_inicio: Optional[datetime] = None,
     fecha_fin: Optional[datetime] = None,
     activa: Optional[bool] = None,
+    if_none_match: Optional[str] = Header(None),
     current_user: Profesora = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(Clase)
+    etag = etag_lista(RECURSO_CLASES, current_user, await db.scalar(consulta_version(RECURSO_CLASES, current_user)))
+    if coincide(if_none_match, etag):
+        return no_modificado(etag)
+
+    query = select(Clase).options(selectinload(Clase.profesora))
     
     # Si no es admin, solo ver sus propias clases
     if not current_user.is_admin:
-        query = query.filter(Clase.profesora_id == current_user.id)
+        query = query.where(Clase.profesora_id == current_user.id)
     elif profesora_id:
-        query = query.filter(Clase.profesora_id == profesora_id)
+        query = query.where(Clase.profesora_id == profesora_id)
     
     if fecha_inicio:
-        query = query.filter(Clase.fecha_inicio >= fecha_inicio)
+        query = query.where(Clase.fecha_inicio >= fecha_inicio)
     
     if fecha_fin:
-        query = query.filter(Clase.fecha_fin <= fecha_fin)
+        query = query.where(Clase.fecha_fin <= fecha_fin)
     
     if activa is not None:
-        query = query.filter(Clase.activa == activa)
+        query = query.where(Clase.activa == activa)
     
-    clases = query.order_by(Clase.fecha_inicio).all()
-    return [ClaseResponse.model_validate(c) for c in clases]
+    clases = (await db.scalars(query.order_by(Clase.fecha_inicio))).all()
+    return con_etag(respuesta_json(LISTA_CLASES.validate_python(clases, from_attributes=True), LISTA_CLASES), response, etag)
 
 @router.get("/{clase_id}", response_model=ClaseResponse)
 async def get_clase(
     clase_id: int,
     current_user: Profesora = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    clase = db.query(Clase).filter(Clase.id == clase_id).first()
+    clase = await _obtener_clase(db, clase_id)
     
     if not clase:
         raise HTTPException(
@@ -139,9 +162,9 @@ async def actualizar_clase(
     clase_id: int,
     clase_data: ClaseUpdate,
     current_user: Profesora = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    clase = db.query(Clase).filter(Clase.id == clase_id).first()
+    clase = await _obtener_clase(db, clase_id)
     
     if not clase:
         raise HTTPException(
@@ -161,18 +184,19 @@ async def actualizar_clase(
     for field, value in update_data.items():
         setattr(clase, field, value)
     
-    db.commit()
-    db.refresh(clase)
+    await db.run_sync(incrementar_version, RECURSO_CLASES, [clase.profesora_id])
+    await db.commit()
+    cache_dashboard.invalidar(current_user.id, current_user.is_admin)
     
-    return ClaseResponse.model_validate(clase)
+    return ClaseResponse.model_validate(await _obtener_clase(db, clase.id))
 
 @router.delete("/{clase_id}")
 async def eliminar_clase(
     clase_id: int,
     current_user: Profesora = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    clase = db.query(Clase).filter(Clase.id == clase_id).first()
+    clase = await _obtener_clase(db, clase_id)
     
     if not clase:
         raise HTTPException(
@@ -187,17 +211,21 @@ async def eliminar_clase(
             detail="No tienes permisos para eliminar esta clase"
         )
     
-    db.delete(clase)
-    db.commit()
+    await db.delete(clase)
+    await db.run_sync(incrementar_version, RECURSO_CLASES, [clase.profesora_id])
+    await db.commit()
+    cache_dashboard.invalidar(current_user.id, current_user.is_admin)
     
     return {"message": "Clase eliminada exitosamente"}
 
 @router.get("/calendario/mes")
 async def get_calendario_clases(
+    response: Response,
     mes: Optional[int] = None,
     anio: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
     current_user: Profesora = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     tz = pytz.timezone('America/Bogota')
     if not mes or not anio:
@@ -205,6 +233,12 @@ async def get_calendario_clases(
         mes = mes or now.month
         anio = anio or now.year
 
+    # Sin mes ni año el cuerpo depende de la fecha: el mes va en el ETag
+    version = await db.scalar(consulta_version(RECURSO_CLASES, current_user))
+    etag = etag_lista(RECURSO_CLASES, current_user, version, f"{anio}-{mes:02d}")
+    if coincide(if_none_match, etag):
+        return no_modificado(etag)
+
     # Primer y último día del mes en zona horaria Colombia
     primer_dia = tz.localize(datetime(anio, mes, 1))
     if mes == 12:
@@ -212,7 +246,7 @@ async def get_calendario_clases(
     else:
         ultimo_dia = tz.localize(datetime(anio, mes + 1, 1)) - timedelta(days=1)
 
-    query = db.query(Clase).filter(
+    query = select(Clase).options(selectinload(Clase.profesora)).where(
         Clase.fecha_inicio >= primer_dia,
         Clase.fecha_inicio <= ultimo_dia,
         Clase.activa == True
@@ -220,8 +254,8 @@ async def get_calendario_clases(
 
     # Si no es admin, solo sus clases
     if not current_user.is_admin:
-        query = query.filter(Clase.profesora_id == current_user.id)
+        query = query.where(Clase.profesora_id == current_user.id)
     
-    clases = query.all()
+    clases = (await db.scalars(query)).all()
     
-    return [ClaseResponse.model_validate(c) for c in clases]
\ No newline at end of file
+    return con_etag(respuesta_json(LISTA_CLASES.validate_python(clases, from_attributes=True), LISTA_CLASES), response, etag)
\ No newline at end of file
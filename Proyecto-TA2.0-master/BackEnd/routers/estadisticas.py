@@ -1,12 +1,21 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func, distinct
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta
 from pydantic import BaseModel
+from typing import Optional
 
-from database import get_db, test_connection
-from models import Profesora, Aprendiz, Clase, Asistencia
+import database
+from database import get_async_db
+from models import Profesora, Aprendiz, Clase, ResumenDiario
 from auth import get_current_user
+from cache_usuarios import cache_usuarios
+from cache_dashboard import cache_dashboard
+from limite_login import limite_login
+from salud import estadisticas_pool, sonda_salud
+from metricas import TIPO_CONTENIDO, autorizado, exponer
 
 router = APIRouter(prefix="", tags=["estadisticas"])
 
@@ -28,7 +37,7 @@ class ClaseResponse(BaseModel):
     fecha_inicio: datetime
     fecha_fin: datetime
     ubicacion: str
-    descripcion: str = None
+    descripcion: Optional[str] = None
     activa: bool
     profesora: ProfesoraResponse
     
@@ -39,57 +48,77 @@ class ClaseResponse(BaseModel):
 @router.get("/estadisticas/dashboard")
 async def get_estadisticas_dashboard(
     current_user: Profesora = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Dashboard con estadísticas principales"""
     
+    # Se cachea por (usuario, rol); las escrituras de asistencia, clases y aprendices lo invalidan
+    cacheado = cache_dashboard.obtener(current_user.id, current_user.is_admin)
+    if cacheado is not None:
+        return cacheado
+    
     # Filtros base según permisos
     if current_user.is_admin:
         # Admin ve todo
-        aprendices_query = db.query(Aprendiz)
-        clases_query = db.query(Clase).filter(Clase.activa == True)
-        asistencias_query = db.query(Asistencia)
+        filtro_aprendices = []
+        filtro_clases = [Clase.activa == True]
+        filtro_dias = []
     else:
         # Profesora ve solo sus datos
-        aprendices_query = db.query(Aprendiz).filter(Aprendiz.profesora_id == current_user.id)
-        clases_query = db.query(Clase).filter(
+        filtro_aprendices = [Aprendiz.profesora_id == current_user.id]
+        filtro_clases = [
             Clase.profesora_id == current_user.id,
             Clase.activa == True
-        )
-        asistencias_query = db.query(Asistencia).filter(Asistencia.profesora_id == current_user.id)
-    
-    # Conteos básicos
-    total_aprendices = aprendices_query.count()
-    total_clases = clases_query.count()
-    total_asistencias = asistencias_query.count()
+        ]
+        filtro_dias = [ResumenDiario.profesora_id == current_user.id]
     
-    # Estadísticas de asistencia del mes actual
     now = datetime.now()
-    primer_dia_mes = datetime(now.year, now.month, 1)
+    primer_dia_mes = datetime(now.year, now.month, 1).date()
+    del_mes = ResumenDiario.fecha >= primer_dia_mes
     
-    asistencias_mes = asistencias_query.filter(
-        Asistencia.fecha >= primer_dia_mes.date()
-    )
+    # Todos los conteos en una sola consulta: subconsultas escalares para aprendices y
+    # clases, y sumas condicionales sobre el resumen diario (un registro por profesora y
+    # día) para el total y el mes actual
+    asistencias = select(
+        func.coalesce(func.sum(ResumenDiario.total), 0).label("total"),
+        func.coalesce(func.sum(case((del_mes, ResumenDiario.total), else_=0)), 0).label("mes"),
+        func.coalesce(func.sum(case((del_mes, ResumenDiario.presentes), else_=0)), 0).label("presentes_mes")
+    ).where(*filtro_dias).subquery()
     
-    total_asistencias_mes = asistencias_mes.count()
-    presentes_mes = asistencias_mes.filter(Asistencia.presente == True).count()
+    conteos = (await db.execute(select(
+        select(func.count()).select_from(Aprendiz).where(*filtro_aprendices).scalar_subquery().label("aprendices"),
+        select(func.count()).select_from(Clase).where(*filtro_clases).scalar_subquery().label("clases"),
+        asistencias.c.total,
+        asistencias.c.mes,
+        asistencias.c.presentes_mes
+    ))).one()
+    
+    total_asistencias_mes = int(conteos.mes)
+    presentes_mes = int(conteos.presentes_mes)
     
     porcentaje_asistencia = 0
     if total_asistencias_mes > 0:
         porcentaje_asistencia = round((presentes_mes / total_asistencias_mes) * 100, 2)
     
-    # Clases próximas (siguientes 7 días)
-    fecha_limite = datetime.now() + timedelta(days=7)
-    clases_proximas = clases_query.filter(
-        Clase.fecha_inicio >= datetime.now(),
-        Clase.fecha_inicio <= fecha_limite
-    ).order_by(Clase.fecha_inicio).limit(5).all()
+    # Clases próximas (siguientes 7 días), con su profesora en el mismo JOIN
+    fecha_limite = now + timedelta(days=7)
+    clases_proximas = (await db.scalars(
+        select(Clase)
+        .options(joinedload(Clase.profesora))
+        .where(
+            *filtro_clases,
+            Clase.fecha_inicio >= now,
+            Clase.fecha_inicio <= fecha_limite
+        )
+        .order_by(Clase.fecha_inicio)
+        .limit(5)
+    )).all()
     
-    return {
+    payload = {
         "totales": {
-            "aprendices": total_aprendices,
-            "clases": total_clases,
-            "asistencias_registradas": total_asistencias
+            "aprendices": conteos.aprendices,
+            "clases": conteos.clases,
+            "asistencias_registradas": int(conteos.total)
         },
         "mes_actual": {
             "total_asistencias": total_asistencias_mes,
@@ -99,17 +128,37 @@ async def get_estadisticas_dashboard(
         },
         "clases_proximas": [ClaseResponse.model_validate(c) for c in clases_proximas]
     }
+    cache_dashboard.guardar(current_user.id, current_user.is_admin, payload)
+    return payload
 
 # Endpoint de salud de la aplicación
 @router.get("/health")
 async def health_check():
-    """Verificar estado de la aplicación"""
+    """Verificar estado de la aplicación (la base la verifica sonda_salud en segundo plano)"""
     
-    db_status = "ok" if test_connection() else "error"
+    db = sonda_salud.estado()
     
     return {
         "status": "ok",
         "timestamp": datetime.now().isoformat(),
-        "database": db_status,
+        "database": db["estado"],
+        "database_detalle": db,
+        "pool": {
+            "sync": estadisticas_pool(database.engine),
+            "async": estadisticas_pool(database.async_engine.sync_engine)
+        },
+        "cache_usuarios": cache_usuarios.estadisticas(),
+        "cache_dashboard": cache_dashboard.estadisticas(),
+        "limite_login": limite_login.estadisticas(),
         "version": "1.0.0"
-    }
\ No newline at end of file
+    }
+
+# Métricas para Prometheus (ver metricas.py)
+@router.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    if not autorizado(authorization):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de métricas inválido"
+        )
+    return PlainTextResponse(exponer(), media_type=TIPO_CONTENIDO)
@@ -1,17 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from pydantic import BaseModel
-from passlib.context import CryptContext
 
-from database import get_db
+from database import get_async_db
 from models import Profesora
 from auth import get_current_admin, get_current_user
+from cache_usuarios import cache_usuarios
+from epocas_token import mapa_epocas, revocar_tokens
+from passwords import hashear_password
+from versiones_datos import RECURSO_APRENDICES, RECURSO_CLASES, incrementar_version
 
 router = APIRouter(prefix="/admin/profesoras", tags=["admin-profesoras"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 class ProfesoraUpdate(BaseModel):
     nombre: Optional[str] = None
     email: Optional[str] = None
@@ -33,12 +35,12 @@ class ProfesoraCreate(BaseModel):
 @router.get("/")
 async def listar_profesoras_admin(
     current_admin: Profesora = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Listar todas las profesoras (incluye inactivas). Solo accesible por admin.
     """
-    profesoras = db.query(Profesora).all()
+    profesoras = (await db.scalars(select(Profesora))).all()
     result = []
     for p in profesoras:
         result.append({
@@ -57,9 +59,9 @@ async def actualizar_profesora(
     profesora_id: int,
     profesora_data: ProfesoraUpdate,
     current_admin: Profesora = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    profesora = db.query(Profesora).filter(Profesora.id == profesora_id).first()
+    profesora = await db.get(Profesora, profesora_id)
     
     if not profesora:
         raise HTTPException(
@@ -69,7 +71,7 @@ async def actualizar_profesora(
     
     # Verificar email único si se está cambiando
     if profesora_data.email and profesora_data.email != profesora.email:
-        existing = db.query(Profesora).filter(Profesora.email == profesora_data.email).first()
+        existing = await db.scalar(select(Profesora).where(Profesora.email == profesora_data.email))
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -78,11 +80,22 @@ async def actualizar_profesora(
     
     # Actualizar campos
     update_data = profesora_data.model_dump(exclude_unset=True)
+    # Desactivar, cambiar el rol o el email invalida los tokens ya emitidos
+    revocar = any(
+        field in update_data and update_data[field] != getattr(profesora, field)
+        for field in ("activa", "is_admin", "email")
+    )
     for field, value in update_data.items():
         setattr(profesora, field, value)
+    if revocar:
+        revocar_tokens(profesora)
+    # Los datos de la profesora van anidados en las listas de aprendices y de clases
+    await db.run_sync(incrementar_version, RECURSO_APRENDICES, [profesora_id])
+    await db.run_sync(incrementar_version, RECURSO_CLASES, [profesora_id])
     
-    db.commit()
-    db.refresh(profesora)
+    await db.commit()
+    cache_usuarios.invalidar_profesora(profesora_id)
+    mapa_epocas.fijar(profesora_id, profesora.token_epoch)
     
     return {"message": "Profesora actualizada exitosamente"}
 
@@ -91,9 +104,9 @@ async def cambiar_password_profesora(
     profesora_id: int,
     password_data: ProfesoraPasswordUpdate,
     current_admin: Profesora = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    profesora = db.query(Profesora).filter(Profesora.id == profesora_id).first()
+    profesora = await db.get(Profesora, profesora_id)
     
     if not profesora:
         raise HTTPException(
@@ -102,9 +115,12 @@ async def cambiar_password_profesora(
         )
     
     # Hashear nueva contraseña
-    profesora.hashed_password = pwd_context.hash(password_data.nueva_password)
+    profesora.hashed_password = await hashear_password(password_data.nueva_password)
+    revocar_tokens(profesora)
     
-    db.commit()
+    await db.commit()
+    cache_usuarios.invalidar_profesora(profesora_id)
+    mapa_epocas.fijar(profesora_id, profesora.token_epoch)
     
     return {"message": "Contraseña actualizada exitosamente"}
 
@@ -112,9 +128,9 @@ async def cambiar_password_profesora(
 async def eliminar_profesora(
     profesora_id: int,
     current_admin: Profesora = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    profesora = db.query(Profesora).filter(Profesora.id == profesora_id).first()
+    profesora = await db.get(Profesora, profesora_id)
     
     if not profesora:
         raise HTTPException(
@@ -129,8 +145,12 @@ async def eliminar_profesora(
             detail="No puedes eliminar tu propia cuenta"
         )
     
-    db.delete(profesora)
-    db.commit()
+    await db.delete(profesora)
+    await db.run_sync(incrementar_version, RECURSO_APRENDICES, [profesora_id])
+    await db.run_sync(incrementar_version, RECURSO_CLASES, [profesora_id])
+    await db.commit()
+    cache_usuarios.invalidar_profesora(profesora_id)
+    mapa_epocas.quitar(profesora_id)
     
     return {"message": "Profesora eliminada exitosamente"}
 
@@ -139,17 +159,17 @@ async def eliminar_profesora(
 async def crear_profesora_admin(
     profesora_data: ProfesoraCreate,
     current_admin: Profesora = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Verificar si el email ya existe
-    existing = db.query(Profesora).filter(Profesora.email == profesora_data.email).first()
+    existing = await db.scalar(select(Profesora).where(Profesora.email == profesora_data.email))
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="El email ya está registrado"
         )
 
-    hashed = pwd_context.hash(profesora_data.password)
+    hashed = await hashear_password(profesora_data.password)
     profesora = Profesora(
         nombre=profesora_data.nombre,
         email=profesora_data.email,
@@ -159,7 +179,6 @@ async def crear_profesora_admin(
     )
 
     db.add(profesora)
-    db.commit()
-    db.refresh(profesora)
+    await db.commit()
 
     return {"message": "Profesora creada exitosamente", "id": profesora.id}
\ No newline at end of file
@@ -1,18 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from pydantic import BaseModel
-from passlib.context import CryptContext
 
-from database import get_db
+from database import get_async_db
 from models import Profesora
-from auth import get_current_user, create_access_token
+from auth import get_current_user, create_access_token, datos_token
+from passwords import hashear_password, verificar_password
+from limite_login import limite_login
 
 router = APIRouter(prefix="", tags=["profesoras"])
 
-# Security
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # Esquemas Pydantic para Profesoras
 class ProfesoraCreate(BaseModel):
     nombre: str
@@ -37,10 +36,13 @@ class LoginRequest(BaseModel):
 
 # Endpoints de autenticación
 @router.post("/login")
-async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
-    profesora = db.query(Profesora).filter(Profesora.email == login_data.email).first()
+async def login(login_data: LoginRequest, request: Request, db: AsyncSession = Depends(get_async_db)):
+    # Antes de consultar la base o calcular bcrypt
+    intento = await limite_login.verificar(request, login_data.email)
+
+    profesora = await db.scalar(select(Profesora).where(Profesora.email == login_data.email))
     
-    if not profesora or not pwd_context.verify(login_data.password, profesora.hashed_password):
+    if not profesora or not await verificar_password(login_data.password, profesora.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email o contraseña incorrectos"
@@ -52,7 +54,8 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
             detail="Cuenta inactiva"
         )
     
-    access_token = create_access_token(data={"sub": profesora.email})
+    await limite_login.login_correcto(request, login_data.email, intento)
+    access_token = create_access_token(data=datos_token(profesora))
     return {
         "access_token": access_token,
         "token_type": "bearer",
@@ -60,9 +63,9 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     }
 
 @router.post("/register", response_model=ProfesoraResponse)
-async def register(profesora_data: ProfesoraCreate, db: Session = Depends(get_db)):
+async def register(profesora_data: ProfesoraCreate, db: AsyncSession = Depends(get_async_db)):
     # Verificar si el email ya existe
-    existing_profesora = db.query(Profesora).filter(Profesora.email == profesora_data.email).first()
+    existing_profesora = await db.scalar(select(Profesora).where(Profesora.email == profesora_data.email))
     if existing_profesora:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -70,7 +73,7 @@ async def register(profesora_data: ProfesoraCreate, db: Session = Depends(get_db
         )
     
     # Crear nueva profesora
-    hashed_password = pwd_context.hash(profesora_data.password)
+    hashed_password = await hashear_password(profesora_data.password)
     profesora = Profesora(
         nombre=profesora_data.nombre,
         email=profesora_data.email,
@@ -79,8 +82,8 @@ async def register(profesora_data: ProfesoraCreate, db: Session = Depends(get_db
     )
     
     db.add(profesora)
-    db.commit()
-    db.refresh(profesora)
+    await db.commit()
+    await db.refresh(profesora)
     
     return ProfesoraResponse.model_validate(profesora)
 
@@ -88,9 +91,9 @@ async def register(profesora_data: ProfesoraCreate, db: Session = Depends(get_db
 @router.get("/profesoras", response_model=List[ProfesoraResponse])
 async def get_profesoras(
     current_user: Profesora = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    profesoras = db.query(Profesora).filter(Profesora.activa == True).all()
+    profesoras = (await db.scalars(select(Profesora).where(Profesora.activa == True))).all()
     return [ProfesoraResponse.model_validate(p) for p in profesoras]
 
 @router.get("/me", response_model=ProfesoraResponse)
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import text
+
+import database
+
+# Configuración desde .env
+SALUD_INTERVALO_SEGUNDOS = float(os.getenv("SALUD_INTERVALO_SEGUNDOS", "10"))
+SALUD_TIMEOUT_SEGUNDOS = float(os.getenv("SALUD_TIMEOUT_SEGUNDOS", "5"))
+
+
+def _esperando(pool) -> Optional[int]:
+    """Peticiones bloqueadas esperando conexión. SQLAlchemy no lo expone: se lee de la cola interna"""
+    try:
+        cola = pool._pool
+        if hasattr(cola, "not_empty"):
+            return len(cola.not_empty._waiters)
+        # AsyncAdaptedQueue crea su asyncio.Queue al primer uso
+        if "_queue" in cola.__dict__:
+            return len(cola._queue._getters)
+        return 0
+    except Exception:
+        return None
+
+
+def estadisticas_pool(engine) -> dict:
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {"tipo": type(pool).__name__}
+    return {
+        "tipo": type(pool).__name__,
+        "tamano": pool.size(),
+        "en_uso": pool.checkedout(),
+        "libres": pool.checkedin(),
+        # overflow() es negativo mientras el pool base no se ha llenado
+        "overflow": max(0, pool.overflow()),
+        "max_overflow": pool._max_overflow,
+        "esperando": _esperando(pool),
+    }
+
+
+class SondaSalud:
+    """Verifica la base en segundo plano; /health responde con el último resultado.
+
+    Así el balanceador puede consultar /health tan seguido como quiera sin abrir conexiones
+    ni hacer consultas en cada petición.
+    """
+
+    def __init__(self, intervalo: float):
+        self.intervalo = intervalo
+        self.ok = None
+        self.error = None
+        self.latencia_ms = None
+        self.verificado_en = None
+        self._tarea = None
+
+    async def verificar(self):
+        inicio = time.perf_counter()
+        try:
+            async with database.async_engine.connect() as conn:
+                await asyncio.wait_for(conn.execute(text("SELECT 1")), SALUD_TIMEOUT_SEGUNDOS)
+            self.ok, self.error = True, None
+        except Exception as e:
+            self.ok, self.error = False, str(e) or type(e).__name__
+        self.latencia_ms = round((time.perf_counter() - inicio) * 1000, 1)
+        self.verificado_en = datetime.now()
+
+    async def _bucle(self):
+        while True:
+            await self.verificar()
+            await asyncio.sleep(self.intervalo)
+
+    def iniciar(self):
+        if self._tarea is None:
+            self._tarea = asyncio.create_task(self._bucle())
+
+    async def detener(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    def estado(self) -> dict:
+        if self.ok is None:
+            estado = "desconocido"
+        else:
+            estado = "ok" if self.ok else "error"
+        return {
+            "estado": estado,
+            "verificado_en": self.verificado_en.isoformat() if self.verificado_en else None,
+            "latencia_ms": self.latencia_ms,
+            "error": self.error,
+        }
+
+
+sonda_salud = SondaSalud(SALUD_INTERVALO_SEGUNDOS)
@@ -2,13 +2,11 @@ import os
 from sqlalchemy.orm import Session
 from database import SessionLocal, test_connection
 from models import Profesora
-from passlib.context import CryptContext
+from passwords import get_password_hash
 from dotenv import load_dotenv
 
 load_dotenv()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 def ensure_admin():
     """Crear usuario admin por defecto si no existe"""
     
@@ -28,7 +26,7 @@ def ensure_admin():
             admin_password = os.getenv("ADMIN_PASSWORD", "admin123")
             admin_name = os.getenv("ADMIN_NAME", "Administrador")
             
-            hashed_password = pwd_context.hash(admin_password)
+            hashed_password = get_password_hash(admin_password)
             
             admin_user = Profesora(
                 nombre=admin_name,
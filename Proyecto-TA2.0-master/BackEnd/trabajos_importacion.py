@@ -0,0 +1,177 @@
+"""Importaciones de asistencia en segundo plano.
+
+El archivo se procesa en un hilo del worker que recibió la subida. El estado de cada
+trabajo se guarda en la tabla `importaciones` al encolarlo, al empezar y al terminar, así
+GET /asistencia/importar/{job_id} responde desde cualquier worker. El worker que lo ejecuta
+responde además con el progreso en vivo (filas procesadas) desde memoria.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete
+
+from cache_dashboard import cache_dashboard
+from database import SessionLocal
+from importacion import ImportacionAsistencia, abrir_hoja, detectar_columnas
+from metricas import contar_importacion
+from models import ImportacionEstado
+
+# Configuración desde .env
+IMPORTACION_WORKERS = int(os.getenv("IMPORTACION_WORKERS", "2"))
+IMPORTACION_TTL_SEGUNDOS = int(os.getenv("IMPORTACION_TTL_SEGUNDOS", "3600"))
+IMPORTACION_MAX_TRABAJOS = int(os.getenv("IMPORTACION_MAX_TRABAJOS", "100"))
+
+PENDIENTE = "pendiente"
+PROCESANDO = "procesando"
+COMPLETADO = "completado"
+ERROR = "error"
+
+
+class ColaImportacionLlena(Exception):
+    """Este worker ya tiene IMPORTACION_MAX_TRABAJOS importaciones sin terminar"""
+
+
+class TrabajoImportacion:
+    def __init__(self, profesora_id: int, archivo: str):
+        self.id = uuid.uuid4().hex
+        self.profesora_id = profesora_id
+        self.archivo = archivo
+        self.estado = PENDIENTE
+        self.detalle = None
+        self.importacion: Optional[ImportacionAsistencia] = None
+        self.creado = datetime.now()
+        self.terminado = None
+
+    def a_dict(self) -> dict:
+        importacion = self.importacion
+        return {
+            "job_id": self.id,
+            "profesora_id": self.profesora_id,
+            "estado": self.estado,
+            "archivo": self.archivo,
+            "filas_procesadas": importacion.filas_procesadas if importacion else 0,
+            "aprendices_creados": importacion.aprendices_creados if importacion else 0,
+            "asistencias_creadas": importacion.asistencias_creadas if importacion else 0,
+            "asistencias_actualizadas": importacion.asistencias_actualizadas if importacion else 0,
+            "fechas_procesadas": len(importacion.columnas.fechas) if importacion else 0,
+            "errores": list(importacion.errores) if importacion else [],
+            "detalle": self.detalle,
+            "creado": self.creado.isoformat(),
+            "terminado": self.terminado.isoformat() if self.terminado else None
+        }
+
+
+# Trabajos sin terminar de este worker; los terminados quedan solo en la base
+_trabajos = {}
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=IMPORTACION_WORKERS, thread_name_prefix="importacion")
+
+
+def _guardar(trabajo: TrabajoImportacion, nuevo: bool = False):
+    """Guardar el estado del trabajo en la tabla importaciones, con una sesión propia"""
+    with SessionLocal() as db:
+        estado = ImportacionEstado(
+            id=trabajo.id,
+            profesora_id=trabajo.profesora_id,
+            estado=trabajo.estado,
+            datos=json.dumps(trabajo.a_dict(), ensure_ascii=False),
+            terminado=trabajo.terminado
+        )
+        if nuevo:
+            # Los terminados que vencieron el TTL se borran al encolar uno nuevo
+            db.execute(delete(ImportacionEstado).where(
+                ImportacionEstado.terminado < datetime.now() - timedelta(seconds=IMPORTACION_TTL_SEGUNDOS)
+            ))
+            db.add(estado)
+        else:
+            db.merge(estado)
+        db.commit()
+
+
+def encolar_importacion(archivo, nombre_archivo: str, profesora_id: int) -> TrabajoImportacion:
+    """Copiar el archivo subido a un temporal propio y programar su importación"""
+    trabajo = TrabajoImportacion(profesora_id, nombre_archivo)
+
+    with _lock:
+        if len(_trabajos) >= IMPORTACION_MAX_TRABAJOS:
+            raise ColaImportacionLlena()
+        _trabajos[trabajo.id] = trabajo
+
+    try:
+        _guardar(trabajo, nuevo=True)
+        # El UploadFile se cierra al terminar la petición
+        copia = tempfile.TemporaryFile()
+        shutil.copyfileobj(archivo, copia)
+        copia.seek(0)
+    except Exception:
+        with _lock:
+            _trabajos.pop(trabajo.id, None)
+        raise
+
+    _executor.submit(_ejecutar, trabajo, copia)
+    return trabajo
+
+
+def obtener_trabajo(job_id: str) -> Optional[dict]:
+    """Estado del trabajo (como a_dict), en vivo si lo ejecuta este worker o el guardado en la base"""
+    with _lock:
+        trabajo = _trabajos.get(job_id)
+    if trabajo:
+        return trabajo.a_dict()
+
+    with SessionLocal() as db:
+        estado = db.get(ImportacionEstado, job_id)
+        if not estado:
+            return None
+        if estado.terminado and estado.terminado < datetime.now() - timedelta(seconds=IMPORTACION_TTL_SEGUNDOS):
+            return None
+        return json.loads(estado.datos)
+
+
+def _ejecutar(trabajo: TrabajoImportacion, archivo):
+    trabajo.estado = PROCESANDO
+    db = SessionLocal()
+    try:
+        _guardar(trabajo)
+        try:
+            encabezados, filas = abrir_hoja(archivo)
+        except Exception as e:
+            raise ValueError(f"Error leyendo Excel: {e}") from e
+
+        columnas = detectar_columnas(encabezados)
+        if not columnas.fechas:
+            raise ValueError("No se encontraron columnas de fecha válidas en el archivo")
+
+        try:
+            trabajo.importacion = ImportacionAsistencia(db, trabajo.profesora_id, columnas)
+            trabajo.importacion.procesar(filas)
+            db.commit()
+            cache_dashboard.invalidar(trabajo.profesora_id)
+        except Exception as e:
+            raise ValueError(f"Error guardando en base de datos: {e}") from e
+
+        trabajo.estado = COMPLETADO
+        contar_importacion(trabajo.importacion, ok=True)
+    except Exception as e:
+        db.rollback()
+        trabajo.detalle = str(e)
+        trabajo.estado = ERROR
+        print(f"❌ Importación {trabajo.id} fallida: {e}")
+        contar_importacion(None, ok=False)
+    finally:
+        db.close()
+        archivo.close()
+        trabajo.terminado = datetime.now()
+        try:
+            _guardar(trabajo)
+        except Exception as e:
+            print(f"❌ No se pudo guardar el estado de la importación {trabajo.id}: {e}")
+        with _lock:
+            _trabajos.pop(trabajo.id, None)
@@ -0,0 +1,177 @@
+"""Contar las sentencias SQL de los endpoints de listas para detectar consultas N+1.
+
+Arma la aplicación sobre una base SQLite temporal, la llena con datos sintéticos y hace
+cada petición contando las sentencias que llegan a los motores sync y async. Luego repite
+todo con ESCALA veces más datos: si alguna ruta hace más consultas con más filas, está
+cargando relaciones fila por fila y el script termina con código 1.
+
+No necesita la base de MySQL ni el servidor.
+
+Uso: python verificar_consultas.py
+"""
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+RUTA_BASE = os.path.join(tempfile.mkdtemp(), "consultas.db")
+# Antes de importar database: el motor async se crea al importar el módulo
+os.environ["DATABASE_URL_ASYNC"] = f"sqlite+aiosqlite:///{RUTA_BASE}"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session, sessionmaker
+
+import database
+
+database.engine = create_engine(f"sqlite:///{RUTA_BASE}", connect_args={"check_same_thread": False})
+database.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=database.engine)
+
+from auth import create_access_token, datos_token
+from cache_dashboard import cache_dashboard
+from models import Aprendiz, Asistencia, Base, Clase, Profesora
+from resumen_asistencia import reconstruir_resumen
+from resumen_diario import reconstruir_diario
+from riesgo_aprendices import reconstruir_riesgo
+
+ESCALA = 4
+
+# Por profesora, en la primera pasada
+APRENDICES = 5
+DIAS = 6
+CLASES = 3
+
+HOY = date.today()
+
+
+def rutas():
+    """(nombre, usuario, url) de los endpoints que devuelven listas"""
+    inicio = (HOY - timedelta(days=DIAS * ESCALA)).isoformat()
+    fin = HOY.isoformat()
+    return [
+        ("GET /aprendices", "profesora", "/aprendices"),
+        ("GET /aprendices (admin)", "admin", "/aprendices"),
+        ("GET /clases", "profesora", "/clases"),
+        ("GET /clases (admin)", "admin", "/clases"),
+        ("GET /clases/calendario/mes", "profesora", "/clases/calendario/mes"),
+        ("GET /asistencia/", "profesora", "/asistencia/"),
+        ("GET /asistencia/ (admin)", "admin", "/asistencia/"),
+        ("GET /asistencia/?limit", "profesora", "/asistencia/?limit=10"),
+        ("GET /asistencia/listas/", "profesora", "/asistencia/listas/"),
+        ("GET /asistencia/matriz", "admin", f"/asistencia/matriz?fecha_inicio={inicio}&fecha_fin={fin}"),
+        ("GET /asistencia/reporte", "admin", f"/asistencia/reporte?fecha_inicio={inicio}&fecha_fin={fin}"),
+        ("GET /asistencia/reporte?detalle=completo", "profesora",
+         f"/asistencia/reporte?fecha_inicio={inicio}&fecha_fin={fin}&detalle=completo"),
+        ("GET /asistencia/alertas", "admin", "/asistencia/alertas"),
+        ("GET /asistencia/exportar", "profesora", "/asistencia/exportar"),
+        ("GET /estadisticas/dashboard", "profesora", "/estadisticas/dashboard"),
+        ("GET /estadisticas/dashboard (admin)", "admin", "/estadisticas/dashboard"),
+        ("GET /profesoras", "profesora", "/profesoras"),
+        ("GET /admin/profesoras/", "admin", "/admin/profesoras/"),
+    ]
+
+
+def _poblar(db: Session, escala: int) -> dict:
+    """Admin y dos profesoras con aprendices, asistencias y clases; devuelve los tokens"""
+    admin = Profesora(nombre="Admin", email="admin@local", hashed_password="-", especialidad="-", is_admin=True)
+    profesoras = [
+        Profesora(nombre=f"Profesora {i}", email=f"profesora{i}@local", hashed_password="-", especialidad="-")
+        for i in range(2)
+    ]
+    db.add_all([admin, *profesoras])
+    db.flush()
+
+    aprendices = APRENDICES * escala
+    dias = DIAS * escala
+    ahora = datetime.now()
+    for p in profesoras:
+        ids = [
+            db.execute(insert(Aprendiz).values(nombre=f"Aprendiz {p.id}-{i}", documento=f"{p.id}{i:05d}", profesora_id=p.id)).inserted_primary_key[0]
+            for i in range(aprendices)
+        ]
+        db.execute(insert(Asistencia), [
+            {"aprendiz_id": a, "fecha": HOY - timedelta(days=d), "presente": (a + d) % 3 != 0, "profesora_id": p.id}
+            for a in ids for d in range(dias)
+        ])
+        db.execute(insert(Clase), [
+            {"titulo": f"Clase {i}", "ubicacion": "Colegio", "profesora_id": p.id, "activa": True,
+             "fecha_inicio": ahora + timedelta(hours=i), "fecha_fin": ahora + timedelta(hours=i + 1)}
+            for i in range(CLASES * escala)
+        ])
+    db.commit()
+
+    reconstruir_resumen(db)
+    reconstruir_diario(db)
+    reconstruir_riesgo(db)
+    return {
+        "admin": create_access_token(datos_token(admin)),
+        "profesora": create_access_token(datos_token(profesoras[0])),
+    }
+
+
+class ContadorSentencias:
+    def __init__(self, *engines):
+        self.total = 0
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._contar)
+
+    def _contar(self, *args):
+        self.total += 1
+
+
+def contar(client: TestClient, contador: ContadorSentencias, escala: int) -> dict:
+    Base.metadata.drop_all(database.engine)
+    Base.metadata.create_all(database.engine)
+    with database.SessionLocal() as db:
+        tokens = _poblar(db, escala)
+
+    conteos = {}
+    for nombre, usuario, url in rutas():
+        headers = {"Authorization": f"Bearer {tokens[usuario]}"}
+        # La primera petición llena las cachés de usuarios y épocas; se cuenta la segunda
+        client.get(url, headers=headers)
+        cache_dashboard.limpiar()
+        antes = contador.total
+        respuesta = client.get(url, headers=headers)
+        if respuesta.status_code != 200:
+            raise RuntimeError(f"{nombre}: {respuesta.status_code} {respuesta.text[:200]}")
+        conteos[nombre] = contador.total - antes
+    return conteos
+
+
+def _aplicacion() -> FastAPI:
+    """Los mismos routers que main.py, sin crear tablas en MySQL al importar"""
+    from routers.asistencia import router as asistencia_router
+    from routers.aprendices import router as aprendices_router
+    from routers.profesoras import router as profesoras_admin_router
+    from routers.clases import router as clases_router
+    from routers.profesoras_general import router as profesoras_general_router
+    from routers.estadisticas import router as estadisticas_router
+
+    app = FastAPI()
+    for router in (asistencia_router, aprendices_router, profesoras_admin_router,
+                   clases_router, profesoras_general_router, estadisticas_router):
+        app.include_router(router)
+    return app
+
+
+def verificar() -> bool:
+    app = _aplicacion()
+    contador = ContadorSentencias(database.engine, database.async_engine.sync_engine)
+    with TestClient(app) as client:
+        base = contar(client, contador, 1)
+        grande = contar(client, contador, ESCALA)
+
+    ok = True
+    for nombre, consultas in base.items():
+        if grande[nombre] > consultas:
+            ok = False
+            print(f"❌ {nombre}: {consultas} -> {grande[nombre]} consultas con {ESCALA}x datos")
+        else:
+            print(f"✅ {nombre}: {grande[nombre]} consultas")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verificar() else 1)
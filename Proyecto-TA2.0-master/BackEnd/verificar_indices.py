@@ -0,0 +1,94 @@
+"""Revisar con EXPLAIN que las consultas frecuentes de los routers usen índices.
+
+Termina con código 1 si alguna consulta recorre completa una de las tablas grandes.
+Conviene correrlo contra una base con datos reales: con tablas casi vacías MySQL
+puede preferir un recorrido completo aunque exista el índice.
+
+Uso: python verificar_indices.py
+"""
+import sys
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, func, or_, select, text
+
+from models import Aprendiz, Asistencia, Clase, ResumenAsistencia
+from resumen_diario import consulta_totales
+
+TABLAS_VIGILADAS = {"asistencias", "aprendices", "clases", "resumen_diario"}
+
+HOY = date.today()
+INICIO_MES = HOY.replace(day=1)
+
+
+def consultas_frecuentes(profesora_id: int = 1):
+    """(nombre, sentencia) con la misma forma que las consultas de los routers"""
+    return [
+        ("GET /asistencia/ (profesora + rango de fechas, página por clave)",
+         select(Asistencia.id, Asistencia.aprendiz_id, Asistencia.fecha, Asistencia.presente,
+                Asistencia.profesora_id, Aprendiz.nombre, Aprendiz.documento)
+         .join(Aprendiz, Aprendiz.id == Asistencia.aprendiz_id)
+         .where(Asistencia.profesora_id == profesora_id, Asistencia.fecha >= INICIO_MES,
+                or_(Asistencia.fecha < HOY, and_(Asistencia.fecha == HOY, Asistencia.id < 1000)))
+         .order_by(Asistencia.fecha.desc(), Asistencia.id.desc())
+         .limit(101)),
+        ("dashboard y totales del reporte (profesora)", consulta_totales(INICIO_MES, HOY, profesora_id)),
+        ("dashboard y totales del reporte (admin, todas)", consulta_totales(INICIO_MES, HOY)),
+        ("importador: aprendices de la profesora",
+         select(Aprendiz.id, Aprendiz.nombre, Aprendiz.documento)
+         .where(Aprendiz.profesora_id == profesora_id)
+         .order_by(Aprendiz.id)),
+        ("importador: asistencias existentes en el rango",
+         select(Asistencia.aprendiz_id, Asistencia.fecha, Asistencia.profesora_id)
+         .join(Aprendiz, Aprendiz.id == Asistencia.aprendiz_id)
+         .where(Aprendiz.profesora_id == profesora_id,
+                Asistencia.fecha >= INICIO_MES, Asistencia.fecha <= HOY)),
+        ("resumen por aprendiz",
+         select(Asistencia.aprendiz_id, func.count(), func.min(Asistencia.fecha), func.max(Asistencia.fecha))
+         .where(Asistencia.aprendiz_id.in_([1, 2, 3]))
+         .group_by(Asistencia.aprendiz_id)),
+        ("GET /asistencia/listas/",
+         select(Aprendiz.id, ResumenAsistencia.total, ResumenAsistencia.presentes)
+         .outerjoin(ResumenAsistencia, ResumenAsistencia.aprendiz_id == Aprendiz.id)
+         .where(Aprendiz.profesora_id == profesora_id)),
+        ("exportar: fechas distintas",
+         select(Asistencia.fecha).join(Aprendiz, Aprendiz.id == Asistencia.aprendiz_id)
+         .where(Aprendiz.profesora_id == profesora_id).distinct()),
+        ("GET /clases (profesora + rango)",
+         select(Clase.id).where(Clase.profesora_id == profesora_id,
+                                Clase.fecha_inicio >= datetime.now(),
+                                Clase.fecha_inicio <= datetime.now() + timedelta(days=7))),
+    ]
+
+
+def _recorridos_completos(conn, sql: str) -> list:
+    """Tablas vigiladas que el plan recorre completas"""
+    if conn.dialect.name == "sqlite":
+        plan = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+        return [fila.detail for fila in plan
+                if fila.detail.startswith("SCAN ")
+                and fila.detail.split()[1] in TABLAS_VIGILADAS
+                and "INDEX" not in fila.detail]
+
+    plan = conn.execute(text(f"EXPLAIN {sql}")).mappings().all()
+    return [fila["table"] for fila in plan
+            if fila["type"] == "ALL" and fila["table"] in TABLAS_VIGILADAS]
+
+
+def verificar(engine) -> bool:
+    ok = True
+    with engine.connect() as conn:
+        for nombre, stmt in consultas_frecuentes():
+            sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+            completos = _recorridos_completos(conn, sql)
+            if completos:
+                ok = False
+                print(f"❌ {nombre}: recorrido completo de {', '.join(completos)}")
+            else:
+                print(f"✅ {nombre}")
+    return ok
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    sys.exit(0 if verificar(engine) else 1)
@@ -0,0 +1,63 @@
+"""Verificar que el límite de intentos de login por IP solo cuente los intentos fallidos.
+
+Un colegio entero puede entrar desde una sola IP (NAT): LOGIN_MAX_POR_IP + 1 logins correctos
+seguidos desde la misma IP tienen que responder 200. Después, los intentos fallidos desde esa
+IP (con emails distintos, para no tocar el límite por email) tienen que terminar en 429.
+
+Arma la aplicación sobre una base SQLite temporal; no necesita MySQL ni el servidor.
+
+Uso: python verificar_limite_login.py
+"""
+import asyncio
+import sys
+
+from fastapi.testclient import TestClient
+
+# Primero: apunta database.engine y el motor async a una base SQLite temporal
+from verificar_consultas import _aplicacion
+
+import database
+from limite_login import LOGIN_MAX_POR_IP
+from models import Base, Profesora
+from passwords import hashear_password
+
+EMAIL = "profesora@local"
+PASSWORD = "clave-correcta"
+
+
+def _poblar():
+    Base.metadata.create_all(database.engine)
+    with database.SessionLocal() as db:
+        db.add(Profesora(nombre="Profesora", email=EMAIL, especialidad="-",
+                         hashed_password=asyncio.run(hashear_password(PASSWORD))))
+        db.commit()
+
+
+def verificar() -> bool:
+    _poblar()
+    ok = True
+    with TestClient(_aplicacion()) as client:
+        correctos = [
+            client.post("/login", json={"email": EMAIL, "password": PASSWORD}).status_code
+            for _ in range(LOGIN_MAX_POR_IP + 1)
+        ]
+        if all(codigo == 200 for codigo in correctos):
+            print(f"✅ {len(correctos)} logins correctos desde la misma IP, ninguno bloqueado")
+        else:
+            print(f"❌ logins correctos desde la misma IP: {correctos}")
+            ok = False
+
+        fallidos = [
+            client.post("/login", json={"email": f"nadie{i}@local", "password": "x"}).status_code
+            for i in range(LOGIN_MAX_POR_IP + 1)
+        ]
+        if fallidos[:LOGIN_MAX_POR_IP] == [401] * LOGIN_MAX_POR_IP and fallidos[-1] == 429:
+            print(f"✅ {LOGIN_MAX_POR_IP} intentos fallidos desde la misma IP y el siguiente recibe 429")
+        else:
+            print(f"❌ intentos fallidos desde la misma IP: {fallidos}")
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verificar() else 1)
@@ -0,0 +1,143 @@
+"""Verificar que los totales de GET /asistencia/reporte cuadren con su desglose por aprendiz.
+
+Los totales salen del resumen diario y el desglose de las asistencias de los aprendices de
+la profesora. Los dos tienen que usar el mismo alcance (la profesora del aprendiz), también
+cuando un admin registra, edita o borra asistencia de los aprendices de una profesora o
+cuando un aprendiz pasa de una profesora a otra. Después de cada paso compara, para cada
+usuario y cada detalle, los totales con la suma de las filas, y el resumen diario con uno
+reconstruido desde cero.
+
+Arma la aplicación sobre una base SQLite temporal; no necesita MySQL ni el servidor.
+
+Uso: python verificar_reporte.py
+"""
+import sys
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+# Primero: apunta database.engine y el motor async a una base SQLite temporal
+from verificar_consultas import _aplicacion
+
+import database
+from auth import create_access_token, datos_token
+from models import Aprendiz, Base, Profesora, ResumenDiario
+from resumen_diario import reconstruir_diario
+
+HOY = date.today()
+INICIO = HOY - timedelta(days=10)
+
+
+def _poblar() -> dict:
+    """Admin y dos profesoras con dos aprendices cada una; devuelve tokens e ids"""
+    Base.metadata.create_all(database.engine)
+    with database.SessionLocal() as db:
+        admin = Profesora(nombre="Admin", email="admin@local", hashed_password="-", especialidad="-", is_admin=True)
+        profesoras = [
+            Profesora(nombre=f"Profesora {i}", email=f"profesora{i}@local", hashed_password="-", especialidad="-")
+            for i in range(2)
+        ]
+        db.add_all([admin, *profesoras])
+        db.flush()
+        aprendices = [
+            Aprendiz(nombre=f"Aprendiz {p.id}-{i}", documento=f"{p.id}{i}", profesora_id=p.id)
+            for p in profesoras for i in range(2)
+        ]
+        db.add_all(aprendices)
+        db.commit()
+        return {
+            "headers": {
+                "admin": {"Authorization": f"Bearer {create_access_token(datos_token(admin))}"},
+                "p0": {"Authorization": f"Bearer {create_access_token(datos_token(profesoras[0]))}"},
+                "p1": {"Authorization": f"Bearer {create_access_token(datos_token(profesoras[1]))}"},
+            },
+            "profesoras": [p.id for p in profesoras],
+            "aprendices": [a.id for a in aprendices],
+        }
+
+
+def _resumen_diario() -> set:
+    with database.SessionLocal() as db:
+        return set(db.execute(select(ResumenDiario.profesora_id, ResumenDiario.fecha,
+                                     ResumenDiario.total, ResumenDiario.presentes)).all())
+
+
+def _revisar(client: TestClient, datos: dict, paso: str) -> bool:
+    ok = True
+    p0, p1 = datos["profesoras"]
+    consultas = [
+        ("profesora 0", "p0", ""),
+        ("profesora 1", "p1", ""),
+        ("admin, profesora 0", "admin", f"&profesora_id={p0}"),
+        ("admin, profesora 1", "admin", f"&profesora_id={p1}"),
+        ("admin, todas", "admin", ""),
+    ]
+    for nombre, usuario, filtro in consultas:
+        for detalle in ("aprendices", "completo"):
+            url = f"/asistencia/reporte?fecha_inicio={INICIO}&fecha_fin={HOY}&detalle={detalle}{filtro}"
+            respuesta = client.get(url, headers=datos["headers"][usuario])
+            if respuesta.status_code != 200:
+                print(f"❌ {paso} / {nombre} / {detalle}: {respuesta.status_code} {respuesta.text[:200]}")
+                ok = False
+                continue
+            reporte = respuesta.json()
+            totales = reporte["totales"]
+            filas = reporte["aprendices"]
+            suma = (sum(f["total_clases"] for f in filas), sum(f["asistencias"] for f in filas))
+            if suma != (totales["total_registros"], totales["asistencias"]):
+                print(f"❌ {paso} / {nombre} / {detalle}: totales {totales['total_registros']}/"
+                      f"{totales['asistencias']}, desglose {suma[0]}/{suma[1]}")
+                ok = False
+
+    actual = _resumen_diario()
+    with database.SessionLocal() as db:
+        reconstruir_diario(db)
+    if actual != _resumen_diario():
+        print(f"❌ {paso}: el resumen diario no coincide con uno reconstruido")
+        ok = False
+    if ok:
+        print(f"✅ {paso}")
+    return ok
+
+
+def verificar() -> bool:
+    datos = _poblar()
+    admin, p0 = datos["headers"]["admin"], datos["headers"]["p0"]
+    a0, a1, b0, _ = datos["aprendices"]
+    p1_id = datos["profesoras"][1]
+    dia = lambda n: (HOY - timedelta(days=n)).isoformat()
+
+    ok = True
+    with TestClient(_aplicacion()) as client:
+        client.post("/asistencia/", json={"aprendiz_id": a0, "fecha": dia(1), "presente": True}, headers=p0)
+        ok &= _revisar(client, datos, "la profesora registra a su aprendiz")
+
+        propia = client.post("/asistencia/", json={"aprendiz_id": a0, "fecha": dia(2), "presente": False}, headers=admin)
+        client.post("/asistencia/", json={"aprendiz_id": b0, "fecha": dia(2), "presente": True}, headers=admin)
+        ok &= _revisar(client, datos, "un admin registra a aprendices de las profesoras")
+
+        client.post("/asistencia/masiva/v2", headers=admin, json={
+            "fecha": dia(3), "asistencias": [{"aprendiz_id": a0, "presente": True}, {"aprendiz_id": a1, "presente": False}]
+        })
+        client.post("/asistencia/masiva", headers=admin, json={
+            "fecha": dia(4), "asistencias": [{"aprendiz_id": a1, "presente": True}, {"aprendiz_id": b0, "presente": False}]
+        })
+        client.patch("/asistencia/toggle/", json={"aprendiz_id": a1, "fecha": dia(3), "presente": True}, headers=p0)
+        ok &= _revisar(client, datos, "asistencia masiva del admin y toggle de la profesora")
+
+        asistencia_id = propia.json()["id"]
+        client.put(f"/asistencia/{asistencia_id}", json={"presente": True}, headers=admin)
+        ok &= _revisar(client, datos, "un admin edita una asistencia que registró")
+        client.delete(f"/asistencia/{asistencia_id}", headers=admin)
+        ok &= _revisar(client, datos, "un admin borra una asistencia que registró")
+
+        client.put(f"/aprendices/{a1}", json={"profesora_id": p1_id}, headers=admin)
+        ok &= _revisar(client, datos, "un aprendiz pasa a otra profesora")
+        client.delete(f"/aprendices/{a1}", headers=admin)
+        ok &= _revisar(client, datos, "se borra un aprendiz")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verificar() else 1)
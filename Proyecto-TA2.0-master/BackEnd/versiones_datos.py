@@ -0,0 +1,87 @@
+"""Versiones de los datos por (profesora, recurso) para los GET de listas con ETag.
+
+Las rutas que escriben asistencias, aprendices o clases incrementan, en la misma
+transacción, la versión del recurso de las profesoras afectadas (tabla versiones_datos).
+Los GET de listas arman el ETag con esa versión antes de hacer la consulta de la lista y,
+si coincide con If-None-Match, responden 304 sin cuerpo.
+
+Una escritura de asistencias sube la versión de quien la registró (GET /asistencia/ filtra
+por ella) y la de la profesora del aprendiz (GET /asistencia/listas/ filtra por ella).
+
+Para una profesora la versión es la de su fila; para un admin, que ve los datos de todas,
+es la suma de las filas del recurso, que cambia con cualquier escritura. Las versiones
+están en la base y no en memoria para que todos los workers respondan lo mismo.
+"""
+from typing import Iterable, Optional
+
+from fastapi import Response
+from sqlalchemy import func, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import VersionDatos
+
+RECURSO_ASISTENCIAS = "asistencias"
+RECURSO_APRENDICES = "aprendices"
+RECURSO_CLASES = "clases"
+
+
+def incrementar_version(db: Session, recurso: str, profesora_ids: Iterable[Optional[int]]):
+    """Sumar 1 a la versión del recurso de esas profesoras, dentro de la transacción actual.
+
+    Con la sesión async se llama con `await db.run_sync(incrementar_version, recurso, ids)`.
+    """
+    ids = sorted({p for p in profesora_ids if p is not None})
+    if not ids:
+        return
+
+    tabla = VersionDatos.__table__
+    filas = [{"recurso": recurso, "profesora_id": p, "version": 1} for p in ids]
+    if db.get_bind().dialect.name == "sqlite":
+        stmt = sqlite_insert(tabla).values(filas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["recurso", "profesora_id"],
+            set_={"version": tabla.c.version + 1}
+        )
+    else:
+        stmt = mysql_insert(tabla).values(filas)
+        stmt = stmt.on_duplicate_key_update(version=tabla.c.version + 1)
+    db.execute(stmt)
+
+
+def consulta_version(recurso: str, usuario):
+    """SELECT de la versión que ve el usuario; se ejecuta con la sesión sync o la async"""
+    query = select(func.coalesce(func.sum(VersionDatos.version), 0)).where(VersionDatos.recurso == recurso)
+    if not getattr(usuario, 'is_admin', False):
+        query = query.where(VersionDatos.profesora_id == usuario.id)
+    return query
+
+
+def etag_lista(recurso: str, usuario, version: int, *partes) -> str:
+    """ETag débil: recurso, alcance (profesora o todas), versión y lo que además cambie el cuerpo"""
+    alcance = "todas" if getattr(usuario, 'is_admin', False) else f"p{usuario.id}"
+    return 'W/"' + ".".join([recurso, alcance, f"v{version}", *map(str, partes)]) + '"'
+
+
+def coincide(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    etiquetas = {e.strip() for e in if_none_match.split(",")}
+    return "*" in etiquetas or etag in etiquetas or etag[2:] in etiquetas
+
+
+def _cabeceras(etag: str) -> dict:
+    # no-cache: el navegador guarda la lista pero la revalida con If-None-Match en cada GET
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def no_modificado(etag: str) -> Response:
+    return Response(status_code=304, headers=_cabeceras(etag))
+
+
+def con_etag(contenido, response: Response, etag: str):
+    """Agregar el ETag a la respuesta, sea un Response ya armado o contenido para FastAPI"""
+    destino = contenido if isinstance(contenido, Response) else response
+    destino.headers.update(_cabeceras(etag))
+    return contenido
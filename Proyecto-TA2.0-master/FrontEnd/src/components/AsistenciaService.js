@@ -117,10 +117,26 @@ export const asistenciaService = {
         body: formData,
       });
 
-      if (response && response.ok) {
-        return await response.json();
+      if (!response || !response.ok) {
+        throw new Error('Error al importar archivo');
+      }
+
+      // La importación corre en segundo plano: consultar su estado hasta que termine
+      const { job_id } = await response.json();
+      while (true) {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const estadoResponse = await authenticatedFetch(`/asistencia/importar/${job_id}`);
+        if (!estadoResponse.ok) {
+          throw new Error('Error al consultar la importación');
+        }
+        const trabajo = await estadoResponse.json();
+        if (trabajo.estado === 'completado') {
+          return trabajo;
+        }
+        if (trabajo.estado === 'error') {
+          throw new Error(trabajo.detalle || 'Error al importar archivo');
+        }
       }
-      throw new Error('Error al importar archivo');
     } catch (error) {
       console.error('Error importing Excel:', error);
       throw error;